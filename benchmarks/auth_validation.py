@@ -0,0 +1,164 @@
+"""
+Behaviour and speed of the auth request schemas against their previous definition (`Field(regex=PASSWORD_REGEX)`
+and `EmailStr`).
+
+The equivalence checks exit with an error on the first difference:
+
+    password : `is_valid_password` against `re.match(PASSWORD_REGEX, ...)` for every code point in every position
+               that decides a policy rule, and for random strings.
+    schema : Values, errors and JSON schema of both registration and login schema versions.
+
+    python -m benchmarks.auth_validation --random 200000 --number 20000
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+from typing import Callable, Iterable, List
+
+from pydantic import BaseModel, EmailStr, Field, ValidationError
+
+from core.auth.schemas import UserLoginRequest, UserRegistrationRequestSchema
+from core.auth.validators import is_valid_password
+from core.constants import PASSWORD_REGEX
+
+_PASSWORD_PATTERN = re.compile(PASSWORD_REGEX)
+
+
+class LegacyUserRegistrationRequestSchema(BaseModel):
+    __doc__ = UserRegistrationRequestSchema.__doc__
+    first_name: str = Field(min_length=1, max_length=50)
+    last_name: str = Field(min_length=1, max_length=50)
+    password: str = Field(regex=PASSWORD_REGEX)
+    email: EmailStr
+
+    class Config:
+        extra = "forbid"
+        title = UserRegistrationRequestSchema.__name__
+
+
+class LegacyUserLoginRequest(BaseModel):
+    __doc__ = UserLoginRequest.__doc__
+    email: EmailStr
+    password: str
+
+    class Config:
+        extra = "forbid"
+        title = UserLoginRequest.__name__
+
+
+def _fail(message: str) -> None:
+    print(f"MISMATCH {message}")
+    sys.exit(1)
+
+
+def _check_passwords(values: Iterable[str]) -> int:
+    count = 0
+    for value in values:
+        if is_valid_password(value) != bool(_PASSWORD_PATTERN.match(value)):
+            _fail(f"password {value!r}")
+        count += 1
+    return count
+
+
+def _code_point_cases() -> Iterable[str]:
+    # Each template is valid for exactly the characters that satisfy the missing rule, or any body character.
+    templates = ["Abcdef#{}", "abcde1#{}", "ABCDE1#{}", "Abcde12{}", "Abc1#{}de", "{}Abcd1#", "Abcd1#{}\n",
+                 "Abcd1#x{}{}"]
+    for code_point in range(sys.maxunicode + 1):
+        character = chr(code_point)
+        for template in templates:
+            yield template.format(character, character)
+
+
+def _random_cases(count: int, seed: int) -> Iterable[str]:
+    alphabet = "aZ9@$!%*#?&bY0 \n\t.-_٣éÉ①１İK\x00"
+    rng = random.Random(seed)
+    for _ in range(count):
+        value = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+        yield value
+        yield value + "\n"
+
+
+def _outcome(schema, payload: dict):
+    try:
+        return "value", schema(**payload).dict()
+    except ValidationError as e:
+        return "errors", e.errors()
+
+
+REGISTRATION_PAYLOADS: List[dict] = [
+    {"first_name": "Ada", "last_name": "Lovelace", "email": email, "password": password}
+    for email in ["ada@example.com", " Ada@Example.COM ", "Ada <ada@example.com>", "not-an-email", "a@b", "",
+                  "x" * 300 + "@example.com", "ada@localhost", "ada@[127.0.0.1]", "élève@exemple.fr"]
+    for password in ["Passw0rd#", "password", "Passw0rd#\n", "Passw0rd#\n\n", "P٣ssword#", "Pa#1" * 10, "",
+                     "Abcdefg1#xyz", "Abcdefg1#xyza"]
+] + [
+    {"first_name": "", "last_name": "Lovelace", "email": "ada@example.com", "password": "Passw0rd#"},
+    {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": 12345678},
+    {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": None},
+    {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": "Passw0rd#", "x": 1},
+]
+LOGIN_PAYLOADS: List[dict] = [{"email": payload["email"], "password": payload["password"]}
+                              for payload in REGISTRATION_PAYLOADS]
+
+
+def _check_schemas() -> int:
+    pairs = [(LegacyUserRegistrationRequestSchema, UserRegistrationRequestSchema, REGISTRATION_PAYLOADS),
+             (LegacyUserLoginRequest, UserLoginRequest, LOGIN_PAYLOADS)]
+    count = 0
+    for legacy, current, payloads in pairs:
+        if legacy.schema() != current.schema():
+            _fail(f"JSON schema of {current.__name__}: {legacy.schema()} != {current.schema()}")
+        for payload in payloads:
+            # Twice, the second run is served from the email cache.
+            for _ in range(2):
+                if (expected := _outcome(legacy, payload)) != (actual := _outcome(current, payload)):
+                    _fail(f"{current.__name__} {payload!r}: {expected} != {actual}")
+                count += 1
+    return count
+
+
+def _time(function: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def _validate(schema, payload: dict) -> None:
+    try:
+        schema(**payload)
+    except ValidationError:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--random", type=int, default=200000, help="Random passwords to compare.")
+    parser.add_argument("--number", type=int, default=20000, help="Validations per timing.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"password: {_check_passwords(_code_point_cases())} code point cases identical")
+    print(f"password: {_check_passwords(_random_cases(args.random, args.seed))} random cases identical")
+    print(f"schema: {_check_schemas()} validations identical, JSON schemas identical")
+
+    valid = {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": "Passw0rd#"}
+    cases = [
+        ("register valid", valid),
+        ("register weak password", dict(valid, password="password1")),
+        ("register 64 KiB password", dict(valid, password="Passw0rd#" * 7282)),
+        ("register invalid email", dict(valid, email="not-an-email")),
+    ]
+    print(f"{'case':<28}{'before us':>12}{'after us':>12}{'speedup':>10}")
+    for name, payload in cases:
+        before = _time(lambda: _validate(LegacyUserRegistrationRequestSchema, payload), args.number)
+        after = _time(lambda: _validate(UserRegistrationRequestSchema, payload), args.number)
+        print(f"{name:<28}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+    login = {"email": "ada@example.com", "password": "Passw0rd#"}
+    before = _time(lambda: _validate(LegacyUserLoginRequest, login), args.number)
+    after = _time(lambda: _validate(UserLoginRequest, login), args.number)
+    print(f"{'login valid':<28}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Concurrent register and login throughput on SQLite, with and without the SQLite profile.
+
+Every run migrates a fresh database file and measures two things:
+
+    http : `--requests` registrations followed by as many logins, sent from `--concurrency` client threads to the
+           application started with uvicorn and `--workers` worker processes. bcrypt dominates these numbers.
+    database : The database transactions of the same registrations and logins, run by `--workers` processes with
+               `--concurrency` threads in total and a precomputed password hash, which isolates the SQLite cost.
+
+The required application settings (secret keys, host, ...) are read from the environment or `.env` as usual,
+DATABASE_URL is replaced by the benchmark database.
+
+    python -m benchmarks.sqlite_auth_throughput --requests 400 --concurrency 32 --workers 2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Bench#2026"
+
+
+def _summarize(results: List[Tuple[bool, float]], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "ok": sum(ok for ok, _ in results),
+        "errors": sum(not ok for ok, _ in results),
+        "throughput": len(results) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+    }
+
+
+def _timed(function: Callable[[], bool]) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    try:
+        ok = function()
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+def _post(url: str, payload: dict) -> bool:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            return 200 <= response.status < 300
+    except urllib.error.HTTPError:
+        return False
+
+
+def _run_http_phase(url: str, payloads: List[dict], concurrency: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda payload: _timed(lambda: _post(url, payload)), payloads))
+    return _summarize(results, time.perf_counter() - started)
+
+
+def _wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The server exited during startup.")
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/health/ready", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("The server did not become ready in time.")
+
+
+def run_http(env: Dict[str, str], emails: List[str], args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+                               "--workers", str(args.workers), "--log-level", "warning"], cwd=PROJECT_DIR, env=env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_until_ready(base_url, server)
+        return {
+            "register": _run_http_phase(f"{base_url}/api/register", [
+                {"first_name": "Bench", "last_name": "Mark", "email": email, "password": PASSWORD}
+                for email in emails], args.concurrency),
+            "login": _run_http_phase(f"{base_url}/api/login", [
+                {"email": email, "password": PASSWORD} for email in emails], args.concurrency),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def database_worker(emails: List[str], threads: int, start_at: float) -> None:
+    """
+    Run the database transactions of registering and logging in `emails` and print the results as JSON. Runs in a
+    child process, so the application config is read from the environment prepared by `run_database`.
+    """
+    from datetime import datetime, timedelta
+
+    from core.auth.models import User, RefreshTokenFamily
+    from core.auth.utils import Hasher
+    from core.database.core import SessionLocal
+    from core.outbox.services import enqueue_otp_message
+
+    password_hash = Hasher.get_password_hash(PASSWORD)
+
+    def register(email: str) -> bool:
+        with SessionLocal() as session:
+            if User.get_single_item_ignore_case(User.email, email, session):
+                return False
+            user = User.create_with_uuid(data={"first_name": "Bench", "last_name": "Mark", "email": email,
+                                               "password": password_hash}, session=session)
+            enqueue_otp_message(user, session)
+            session.commit()
+            return True
+
+    def login(email: str) -> bool:
+        with SessionLocal() as session:
+            if not (user := User.get_single_item_ignore_case(User.email, email, session)):
+                return False
+            RefreshTokenFamily.create_with_uuid(data={"subject": user.email, "generation": 0,
+                                                      "expires_at": datetime.utcnow() + timedelta(days=1)},
+                                                session=session)
+            session.commit()
+            return True
+
+    time.sleep(max(start_at - time.time(), 0))
+    output = {}
+    with ThreadPoolExecutor(threads) as executor:
+        for phase, function in (("register", register), ("login", login)):
+            started = time.time()
+            results = list(executor.map(lambda email: _timed(lambda: function(email)), emails))
+            output[phase] = {"started": started, "finished": time.time(), "results": results}
+    print(json.dumps(output))
+
+
+def run_database(env: Dict[str, str], emails: List[str], args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    start_at = time.time() + 5
+    threads = max(args.concurrency // args.workers, 1)
+    command = [sys.executable, "-m", "benchmarks.sqlite_auth_throughput", "--database-worker", "--start-at",
+               str(start_at), "--concurrency", str(threads)]
+    workers = [subprocess.Popen(command + emails[index::args.workers], cwd=PROJECT_DIR, env=env, stdout=subprocess.PIPE)
+               for index in range(args.workers)]
+    outputs = [json.loads(worker.communicate()[0].decode("utf-8").strip().splitlines()[-1]) for worker in workers]
+    return {
+        phase: _summarize([tuple(result) for output in outputs for result in output[phase]["results"]],
+                          max(output[phase]["finished"] for output in outputs)
+                          - min(output[phase]["started"] for output in outputs))
+        for phase in ("register", "login")
+    }
+
+
+def run_benchmark(profile_enabled: bool, mode: str, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(directory, 'benchmark.db')}",
+                   SQLITE_PROFILE_ENABLED=str(profile_enabled).lower(),
+                   ADMISSION_CONTROL_ENABLED="false",
+                   LOG_LEVEL="WARNING")
+        env.pop("DATABASE_SHARDS", None)
+        subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=PROJECT_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        emails = [f"benchmark{index}@example.com" for index in range(args.requests)]
+        return (run_http if mode == "http" else run_database)(env, emails, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per phase.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", choices=["http", "database"], default=["http", "database"])
+    parser.add_argument("--database-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("emails", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.database_worker:
+        database_worker(args.emails, args.concurrency, args.start_at)
+        return
+
+    print(f"{'mode':<10}{'profile':<9}{'phase':<10}{'ok':>6}{'errors':>8}{'tx/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode in args.modes:
+        for profile_enabled in (False, True):
+            for phase, result in run_benchmark(profile_enabled, mode, args).items():
+                print(f"{mode:<10}{'on' if profile_enabled else 'off':<9}{phase:<10}{result['ok']:>6}"
+                      f"{result['errors']:>8}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}"
+                      f"{result['p95_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
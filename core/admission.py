@@ -0,0 +1,114 @@
+import asyncio
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import app_config
+from core.constants import SERVICE_OVERLOADED
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests of a route class.
+
+    Requests beyond `max_concurrency` wait in a FIFO queue of at most `max_queue` entries for up to `queue_timeout`
+    seconds. `acquire` returns False instead of waiting when the queue is full, or once the deadline passed, so the
+    caller can shed the request while it is still cheap to do so.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters = deque()
+
+    async def acquire(self) -> bool:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return True
+            self._waiters.remove(waiter)
+            return False
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self) -> None:
+        if self._waiters:
+            # Hand the slot over to the oldest waiter, the number of active requests stays the same.
+            self._waiters.popleft().set_result(None)
+        else:
+            self._active -= 1
+
+
+class AdmissionControlMiddleware:
+    """
+    Admission control for HTTP requests.
+
+    Each request is admitted through the limiter of its route class, requests that cannot be admitted in time are
+    answered with 503 and a `Retry-After` header before they take a database connection or worker thread.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: Dict[str, ConcurrencyLimiter], default_limiter: ConcurrencyLimiter,
+                 exempt_paths: Iterable[str] = (), retry_after: int = 1):
+        self.app = app
+        self.limiters = limiters
+        self.default_limiter = default_limiter
+        self.exempt_paths = frozenset(exempt_paths)
+        self.retry_after = str(retry_after)
+
+    def _limiter_for(self, path: str) -> Optional[ConcurrencyLimiter]:
+        if path in self.exempt_paths:
+            return None
+        return self.limiters.get(path, self.default_limiter)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (limiter := self._limiter_for(scope["path"])) is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    content={"message": SERVICE_OVERLOADED},
+                                    headers={"Retry-After": self.retry_after})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+def get_admission_control_options() -> dict:
+    """
+    Build the `AdmissionControlMiddleware` options from the application config.
+    """
+    auth_limiter = ConcurrencyLimiter("auth", app_config.ADMISSION_AUTH_MAX_CONCURRENCY,
+                                      app_config.ADMISSION_AUTH_MAX_QUEUE, app_config.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    default_limiter = ConcurrencyLimiter("default", app_config.ADMISSION_DEFAULT_MAX_CONCURRENCY,
+                                         app_config.ADMISSION_DEFAULT_MAX_QUEUE,
+                                         app_config.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    return {
+        "limiters": {path: auth_limiter for path in app_config.ADMISSION_AUTH_PATHS},
+        "default_limiter": default_limiter,
+        "exempt_paths": app_config.ADMISSION_EXEMPT_PATHS,
+        "retry_after": app_config.ADMISSION_RETRY_AFTER_SECONDS,
+    }
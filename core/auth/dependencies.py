@@ -0,0 +1,34 @@
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+from sqlalchemy.orm import Session
+
+from core.auth.revocation import revocation_list
+from core.auth.services import jwt_authentication
+from core.config import app_config
+from core.constants import ERR_ACCESS_TOKEN_INVALID
+from core.database.core import get_db
+from core.exceptions import UnauthorizedException
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_access_token_payload(credentials: HTTPAuthorizationCredentials = Depends(_bearer),
+                             session: Session = Depends(get_db)) -> dict:
+    """
+    Authenticate the request by its bearer access token and return the token payload.
+
+    Revocation is checked against the in-memory revocation filter first, so tokens that were never revoked are
+    accepted without a database round trip.
+
+    :raises: UnauthorizedException: If the token is missing, invalid, expired or revoked.
+    """
+    if credentials is None:
+        raise UnauthorizedException(ERR_ACCESS_TOKEN_INVALID)
+    try:
+        payload = jwt_authentication.decode_payload(credentials.credentials, app_config.ACCESS_TOKEN_SECRET_KEY)
+    except JWTError:
+        raise UnauthorizedException(ERR_ACCESS_TOKEN_INVALID)
+    if payload.get("sub") is None or revocation_list.is_revoked(payload.get("jti"), session):
+        raise UnauthorizedException(ERR_ACCESS_TOKEN_INVALID)
+    return payload
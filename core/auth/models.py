@@ -1,7 +1,11 @@
-from sqlalchemy import Boolean, Column, String
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, func
+from sqlalchemy.orm import Session
 
 from core.database.core import Base
-from core.database.manager import QueryManager
+from core.database.manager import QueryManager, uuid7
+from core.database.types import UUIDType
 from core.models import TimeStampMixin
 
 
@@ -12,6 +16,14 @@ class User(Base, TimeStampMixin, QueryManager):
     This model is used to store information about users in the application, including their
     firstname, lastname, email, password hash, and other relevant information.
 
+    Emails are stored normalised and looked up through a unique functional index on `lower(email)`.
+
+    Primary keys are time-ordered UUIDv7 values stored natively (PostgreSQL) or as 16 bytes, which keeps inserts
+    appending to the end of the primary key index.
+
+    With sharding enabled users are routed by their normalised email, together with their refresh token families and
+    outbox messages.
+
     Fields:
         first_name (str): The first name of the user.
         last_name (str): The last name of the user.
@@ -22,9 +34,69 @@ class User(Base, TimeStampMixin, QueryManager):
         updated_at (datetime): The timestamp for when the user was last updated.
     """
     __tablename__ = "user"
-    id = Column(String(255), primary_key=True)
+    __id_generator__ = staticmethod(uuid7)
+    __shard_key__ = "email"
+
+    id = Column(UUIDType(), primary_key=True)
     first_name = Column(String(255))
     last_name = Column(String(255))
     email = Column(String(255), unique=True)
     password = Column(String(255))
     is_active = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index("ix_user_email_lower", func.lower(email), unique=True,
+              postgresql_where=email.isnot(None), sqlite_where=email.isnot(None)),
+    )
+
+    @classmethod
+    def activate(cls, user_id: str, session: Session) -> bool:
+        """
+        Activate an inactive user with a single conditional update, without loading the user first.
+
+        :return: True if the user was activated, False if it does not exist or was already active.
+        """
+        return cls.update_by_filters([cls.id == user_id, cls.is_active.is_(False)], {"is_active": True}, session,
+                                     user_id, returning=[cls.id]) > 0
+
+
+class RefreshTokenFamily(Base, TimeStampMixin, QueryManager):
+    """
+    Model for tracking refresh token rotation.
+
+    Every login starts a family, every refresh rotates it to the next generation. Refresh tokens carry their family
+    id and generation, so presenting a token of an older generation reveals reuse of a rotated token and revokes the
+    whole family. One row is stored per login instead of one per issued token. Revoking a family sets its expiry to
+    the revocation time, families are deleted once expired by `TokenRevocationList.prune`.
+
+    Fields:
+        subject (str): The subject of the tokens of the family.
+        generation (int): The generation of the only refresh token of the family that is still valid.
+        revoked (bool): Indicates whether the family has been revoked.
+        expires_at (datetime): The expiry of the current refresh token of the family, the revocation time once revoked.
+    """
+    __tablename__ = "refresh_token_family"
+    __id_generator__ = staticmethod(uuid7)
+    __shard_key__ = "subject"
+
+    id = Column(UUIDType(), primary_key=True)
+    subject = Column(String(255), nullable=False)
+    generation = Column(Integer, nullable=False, default=0)
+    revoked = Column(Boolean, nullable=False, default=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RevokedToken(Base, QueryManager):
+    """
+    Model for storing revoked tokens until they expire.
+
+    Fields:
+        jti (str): The unique id of the revoked token.
+        expires_at (datetime): The expiry of the revoked token, the entry can be pruned afterwards.
+        created_at (datetime): The timestamp for when the token was revoked.
+    """
+    __tablename__ = "revoked_token"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,57 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from core.auth.utils import OTP_INTERVAL_SECONDS
+from core.config import app_config
+
+
+class OTPReplayGuard:
+    """
+    Bounded set of used OTPs, identified by the user id and the time step they were valid for.
+
+    An OTP stays valid for the rest of its time step, claiming it makes every further submission within the step a
+    replay. Entries expire after `ttl` seconds, once the step is over; once more than `max_entries` are stored the
+    oldest ones are evicted. The set is local to the worker, the conditional activation update keeps concurrent
+    submissions to different workers correct.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Entries share one TTL, so the oldest entry is always the first to expire.
+        while self._entries:
+            expires_at = next(iter(self._entries.values()))
+            if expires_at > now and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def claim(self, user_id: str, timecode: int) -> bool:
+        """
+        Mark the OTP of `user_id` for `timecode` as used.
+
+        :return: True if it was not used before, False for a replay.
+        """
+        key = (user_id, timecode)
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            if key in self._entries:
+                return False
+            self._entries[key] = now + self.ttl
+            return True
+
+    def release(self, user_id: str, timecode: int) -> None:
+        """
+        Forget a claimed OTP, so it can be submitted again after its verification failed for another reason.
+        """
+        with self._lock:
+            self._entries.pop((user_id, timecode), None)
+
+
+otp_replay_guard = OTPReplayGuard(OTP_INTERVAL_SECONDS, app_config.OTP_REPLAY_GUARD_MAX_ENTRIES)
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.auth.models import RefreshTokenFamily, RevokedToken
+from core.config import app_config
+from core.database.core import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Entries committed by other workers shortly before a sync may carry an older `created_at`, re-reading this window
+# on every sync makes sure they are not missed. Adding a key twice to the filter is harmless.
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings.
+
+    Sized for `capacity` keys at a false positive rate of `error_rate`, using double hashing of a single blake2b
+    digest to derive the bit positions. Membership tests never give false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenRevocationList:
+    """
+    Revocation list of tokens, identified by their `jti` claim.
+
+    Revoked tokens are stored in the `revoked_token` table and mirrored into an in-memory Bloom filter. Tokens that
+    are not revoked, nearly all of them, are accepted by the filter without a database round trip; only filter hits
+    are confirmed against the table. The filter is kept up to date incrementally by `sync` and rebuilt by `prune`
+    once expired entries have been deleted. Pruning also deletes the expired and revoked refresh token families.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._synced_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: datetime, session: Session) -> None:
+        """
+        Revoke the token `jti` until `expires_at`, as part of the transaction of `session`.
+        """
+        session.merge(RevokedToken(jti=jti, expires_at=expires_at))
+        self._filter.add(jti)
+
+    def is_revoked(self, jti: Optional[str], session: Session) -> bool:
+        if jti is None or jti not in self._filter:
+            return False
+        return RevokedToken.get_single_item_by_filters([RevokedToken.jti == jti], session, jti) is not None
+
+    def sync(self, session: Session) -> None:
+        """
+        Add the entries revoked since the last sync to the filter, all unexpired entries on the first sync.
+        """
+        with self._lock:
+            now = datetime.utcnow()
+            filters = [RevokedToken.expires_at > now]
+            if self._synced_at is not None:
+                filters.append(RevokedToken.created_at >= self._synced_at - _SYNC_OVERLAP)
+            for jti in session.scalars(select(RevokedToken.jti).where(*filters)):
+                self._filter.add(jti)
+            self._synced_at = now
+
+    def prune(self, session: Session) -> int:
+        """
+        Delete the entries whose token has expired and rebuild the filter from the remaining ones. Expired and revoked
+        refresh token families are deleted as well, a refresh with a deleted family fails like one with a revoked one.
+
+        :return: The number of deleted entries.
+        """
+        now = datetime.utcnow()
+        deleted = session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now)).rowcount
+        families = session.execute(delete(RefreshTokenFamily).where(RefreshTokenFamily.expires_at <= now)).rowcount
+        session.commit()
+        logger.info("Pruned %s revoked tokens and %s refresh token families.", deleted, families)
+        with self._lock:
+            unexpired = RevokedToken.expires_at > now
+            remaining = session.scalar(select(func.count()).select_from(RevokedToken).where(unexpired))
+            bloom_filter = BloomFilter(max(self.capacity, 2 * remaining), self.error_rate)
+            for jti in session.scalars(select(RevokedToken.jti).where(unexpired)):
+                bloom_filter.add(jti)
+            self._filter, self._synced_at = bloom_filter, now
+        return deleted
+
+    def _run_with_session(self, method) -> None:
+        with SessionLocal() as session:
+            method(session)
+
+    async def run(self, sync_interval: float, prune_interval: float) -> None:
+        """
+        Sync every `sync_interval` and prune every `prune_interval` seconds until cancelled.
+        """
+        pruned_at = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(sync_interval)
+            try:
+                if asyncio.get_running_loop().time() - pruned_at >= prune_interval:
+                    await run_in_threadpool(self._run_with_session, self.prune)
+                    pruned_at = asyncio.get_running_loop().time()
+                else:
+                    await run_in_threadpool(self._run_with_session, self.sync)
+            except Exception:
+                logger.exception("Token revocation list refresh failed.")
+
+
+def expiry_from_claim(exp: int) -> datetime:
+    """Convert an `exp` claim into the naive UTC datetime stored in `revoked_token.expires_at`."""
+    return datetime.fromtimestamp(exp, tz=timezone.utc).replace(tzinfo=None)
+
+
+revocation_list = TokenRevocationList(app_config.REVOCATION_BLOOM_CAPACITY, app_config.REVOCATION_BLOOM_ERROR_RATE)
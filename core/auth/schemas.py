@@ -1,8 +1,8 @@
 from typing import Union
 
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field
 
-from core.constants import PASSWORD_REGEX
+from core.auth.validators import CachedEmailStr, PasswordStr
 from core.response_models.auth_response_model import ResponseMessage
 
 
@@ -12,8 +12,8 @@ class UserRegistrationRequestSchema(BaseModel):
     """
     first_name: str = Field(min_length=1, max_length=50)
     last_name: str = Field(min_length=1, max_length=50)
-    password: str = Field(regex=PASSWORD_REGEX)
-    email: EmailStr
+    password: PasswordStr
+    email: CachedEmailStr
 
     class Config:
         extra = "forbid"
@@ -52,13 +52,23 @@ class UserLoginRequest(BaseModel):
     """
     Request schema for user login.
     """
-    email: EmailStr
+    email: CachedEmailStr
     password: str
 
     class Config:
         extra = "forbid"
 
 
+class TokenRefreshRequest(BaseModel):
+    """
+    Request schema for token refresh.
+    """
+    refresh_token: str
+
+    class Config:
+        extra = "forbid"
+
+
 class UserVerifyOTPRequest(BaseModel):
     """
     Request schema for user otp verification.
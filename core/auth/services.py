@@ -1,24 +1,54 @@
+from datetime import datetime, timedelta
+
+from jose import JWTError
 from sqlalchemy.orm import Session
 
-from core.auth.models import User
-from core.auth.schemas import UserRegistrationRequestSchema, UserLoginRequest, UserVerifyOTPRequest
-from core.auth.utils import Hasher, JWTAuthenticator, verify_otp, urlsafe_base64_decode, generate_otp, \
-    urlsafe_base64_encode
+from core.auth.models import User, RefreshTokenFamily
+from core.auth.otp import otp_replay_guard
+from core.auth.revocation import revocation_list, expiry_from_claim
+from core.auth.schemas import UserRegistrationRequestSchema, UserLoginRequest, UserVerifyOTPRequest, \
+    TokenRefreshRequest
+from core.auth.utils import Hasher, JWTAuthenticator, verify_otp_timecode, urlsafe_base64_decode
+from core.config import app_config
 from core.constants import ERR_MSG_USER_ALREADY_EXIST, USER_REGISTRATION_SUCCESS, ERR_EMAIL_INCORRECT, \
-    ERR_PASSWORD_INCORRECT, USER_LOGIN_SUCCESS, USER_OTP_VERIFICATION_FAILED, USER_OTP_VERIFICATION_SUCCESS
-from core.exceptions import ExistsError, BadRequestException
-from core.utils import convert_data_into_json
+    ERR_PASSWORD_INCORRECT, USER_LOGIN_SUCCESS, USER_OTP_VERIFICATION_FAILED, USER_OTP_VERIFICATION_SUCCESS, \
+    TOKEN_REFRESH_SUCCESS, ERR_REFRESH_TOKEN_INVALID, ERR_REFRESH_TOKEN_REUSED, USER_LOGOUT_SUCCESS, \
+    USER_OTP_ALREADY_USED, USER_OTP_ACCOUNT_NOT_ACTIVATED
+from core.exceptions import ExistsError, BadRequestException, UnauthorizedException
+from core.outbox.services import enqueue_otp_message
+from core.utils import convert_data_into_json, normalize_email
 
 _hasher = Hasher()
 jwt_authentication = JWTAuthenticator()
 
 
+def _refresh_token_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(minutes=app_config.REFRESH_TOKEN_EXPIRE_MINUTES)
+
+
+def _family_revocation() -> dict:
+    # A revoked family expires immediately, it is deleted by the next prune of the revocation list.
+    return {"revoked": True, "expires_at": datetime.utcnow()}
+
+
+def _create_token_pair(subject: str, family_id: str, generation: int) -> dict:
+    """
+    Create an access token and the refresh token of the given generation of a refresh token family. The access token
+    carries the family id too, so logging out with it can end the family.
+    """
+    access_token = jwt_authentication.create_access_token(payload={"sub": subject, "fam": family_id})
+    refresh_token = jwt_authentication.create_refresh_token(
+        payload={"sub": subject, "fam": family_id, "gen": generation})
+    return {"access_token": access_token, "refresh_token": refresh_token}
+
+
 async def register(request: UserRegistrationRequestSchema, session: Session):
     """
     Register a new user.
     This function is used to register a new user in the application. It takes a `UserRegistrationRequest` instance
     as input, which contains the user's email and password. The function validates the input, creates a new user in
-    the database, and returns a `UserRegistrationResponse` indicating the result of the registration.
+    the database, and returns a `UserRegistrationResponse` indicating the result of the registration. The OTP message
+    is queued in the outbox within the same transaction and delivered in the background.
 
     Parameters:
         request : The user registration request data, including the email and password.
@@ -33,13 +63,13 @@ async def register(request: UserRegistrationRequestSchema, session: Session):
         ExistsError : User with the given email already exists.
     """
     request_data = convert_data_into_json(request)
-    if _ := User.get_single_item_by_filters([User.email == request_data.get("email")], session):
+    request_data["email"] = normalize_email(request_data.get("email"))
+    if _ := User.get_single_item_ignore_case(User.email, request_data.get("email"), session):
         raise ExistsError(ERR_MSG_USER_ALREADY_EXIST)
 
     request_data["password"] = _hasher.get_password_hash(request_data.get("password"))
     data = User.create_with_uuid(data=request_data, session=session)
-    print(urlsafe_base64_encode(str(data.id).encode('utf-8')))
-    print(generate_otp(data.id))
+    enqueue_otp_message(data, session)
     return {"message": USER_REGISTRATION_SUCCESS, "data": data}
 
 
@@ -61,36 +91,105 @@ def login(request: UserLoginRequest, session: Session):
         BadRequestException : if the email or password are not as per the requirement.
     """
     request_data = convert_data_into_json(request)
-    if not (user_object := User.get_single_item_by_filters([User.email == request_data.get("email")], session)):
+    if not (user_object := User.get_single_item_ignore_case(User.email, request_data.get("email"), session)):
         raise BadRequestException(ERR_EMAIL_INCORRECT)
     if not _hasher.verify_password(request_data.get("password"), user_object.password):
         raise BadRequestException(ERR_PASSWORD_INCORRECT)
-    access_token = jwt_authentication.create_access_token(payload={"sub": user_object.email})
-    refresh_token = jwt_authentication.create_refresh_token(payload={"sub": user_object.email})
-    data = {"access_token": access_token, "refresh_token": refresh_token}
+    family = RefreshTokenFamily.create_with_uuid(
+        data={"subject": user_object.email, "generation": 0, "expires_at": _refresh_token_expiry()}, session=session)
+    data = _create_token_pair(user_object.email, family.id, family.generation)
     return {"message": USER_LOGIN_SUCCESS, "data": data}
 
 
+def refresh_token_service(request: TokenRefreshRequest, session: Session):
+    """
+    Exchange a refresh token for a new access token and a rotated refresh token.
+    The refresh token is verified with `REFRESH_TOKEN_SECRET_KEY` and its family is advanced to the next generation
+    with a single conditional update, so no password verification is involved. Presenting a refresh token that has
+    already been rotated revokes its whole family.
+
+    Parameters:
+        request : The token refresh request data, including the refresh token.
+        session : Session
+            A SQLAlchemy Session object used to interact with the database.
+
+    Returns:
+        A response containing the new access and refresh tokens.
+
+    Raises:
+        UnauthorizedException : If the refresh token is invalid, expired, revoked or has already been used.
+    """
+    request_data = convert_data_into_json(request)
+    try:
+        payload = jwt_authentication.decode_refresh_token(request_data.get("refresh_token"))
+    except JWTError:
+        raise UnauthorizedException(ERR_REFRESH_TOKEN_INVALID)
+    subject, family_id, generation = payload.get("sub"), payload.get("fam"), payload.get("gen")
+    if subject is None or family_id is None or not isinstance(generation, int):
+        raise UnauthorizedException(ERR_REFRESH_TOKEN_INVALID)
+
+    family_filters = [RefreshTokenFamily.id == family_id, RefreshTokenFamily.revoked.is_(False)]
+    if not RefreshTokenFamily.update_by_filters(family_filters + [RefreshTokenFamily.generation == generation],
+                                                {"generation": generation + 1,
+                                                 "expires_at": _refresh_token_expiry()}, session, family_id):
+        RefreshTokenFamily.update_by_filters(family_filters, _family_revocation(), session, family_id)
+        raise UnauthorizedException(ERR_REFRESH_TOKEN_REUSED)
+    data = _create_token_pair(subject, family_id, generation + 1)
+    return {"message": TOKEN_REFRESH_SUCCESS, "data": data}
+
+
 def verify_otp_service(request: UserVerifyOTPRequest, session: Session):
     """
-    Login an existing user.
-    This function is used to log in an existing user in the application. It takes a `UserLoginRequest` instance as
-    input, which contains the user's email and password. The function validates the input, checks the user's
-    credentials against the database, and returns a `UserLoginResponse` indicating the result of the login.
+    Verify the OTP of a user and activate the user.
+    This function is used to activate a newly registered user. It takes a `UserVerifyOTPRequest` instance as input,
+    which contains the encoded user id and the OTP sent to the user. A valid OTP is claimed on the OTP replay guard,
+    so it is accepted once per time step, and the user is activated with a single conditional update, without a
+    lookup. The verification fails if the update changed no row, i.e. the user does not exist or is already active.
 
     Parameters:
         request : The user OTP verification request data, including the UID and OTP.
+        session : Session
+            A SQLAlchemy Session object used to interact with the database.
 
     Returns:
-        A response indicating the result of the user login request.
+        A response indicating the result of the user OTP verification request.
 
     Raises:
-        ValueError : If the email address or password is invalid.
-        BadRequestException : if the email or password are not as per the requirement.
+        ValueError : If the UID is not valid base64.
     """
     request_data = convert_data_into_json(request)
-    encoded_uid = request_data.get("uid")
-    otp = request_data.get("otp")
-    if not verify_otp(urlsafe_base64_decode(encoded_uid).decode('utf-8'), otp):
+    user_id = urlsafe_base64_decode(request_data.get("uid")).decode('utf-8')
+    if (timecode := verify_otp_timecode(user_id, request_data.get("otp"))) is None:
         return {"message": USER_OTP_VERIFICATION_FAILED}
+    if not otp_replay_guard.claim(user_id, timecode):
+        return {"message": USER_OTP_ALREADY_USED}
+    try:
+        activated = User.activate(user_id, session)
+    except Exception:
+        otp_replay_guard.release(user_id, timecode)
+        raise
+    if not activated:
+        return {"message": USER_OTP_ACCOUNT_NOT_ACTIVATED}
     return {"message": USER_OTP_VERIFICATION_SUCCESS}
+
+
+def logout(token_payload: dict, session: Session):
+    """
+    Logout the user of an access token.
+    This function revokes the access token until it expires and revokes the refresh token family it was issued with,
+    so neither the access token nor any refresh token of the login can be used again.
+
+    Parameters:
+        token_payload : The payload of the authenticated access token.
+        session : Session
+            A SQLAlchemy Session object used to interact with the database.
+
+    Returns:
+        A response indicating the result of the logout request.
+    """
+    if (jti := token_payload.get("jti")) is not None:
+        revocation_list.revoke(jti, expiry_from_claim(token_payload["exp"]), session)
+    if (family_id := token_payload.get("fam")) is not None:
+        RefreshTokenFamily.update_by_filters([RefreshTokenFamily.id == family_id], _family_revocation(), session,
+                                             family_id)
+    return {"message": USER_LOGOUT_SUCCESS}
@@ -1,6 +1,8 @@
 import base64
+import uuid
 from binascii import Error as BinasciiError
 from datetime import timedelta, datetime, timezone
+from typing import Optional
 
 import pyotp as pyotp
 from jose import jwt
@@ -9,6 +11,7 @@ from starlette import status
 from starlette.exceptions import HTTPException
 
 from core.config import app_config
+from core.profiling import profiled_section
 
 
 class Hasher:
@@ -26,7 +29,8 @@ class Hasher:
         :param hashed_password: The hashed password to compare against.
         :return: True if the passwords match, False otherwise.
         """
-        return Hasher.pwd_context.verify(plain_password, hashed_password)
+        with profiled_section("bcrypt"):
+            return Hasher.pwd_context.verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password):
@@ -35,7 +39,8 @@ class Hasher:
         :param password: A string representing the plain password to be hashed.
         :return: A string representing the hashed password.
         """
-        return Hasher.pwd_context.hash(password)
+        with profiled_section("bcrypt"):
+            return Hasher.pwd_context.hash(password)
 
 
 class JWTAuthenticator:
@@ -50,6 +55,7 @@ class JWTAuthenticator:
     def create_token(self, payload: dict, secret_key: str, expires_delta: timedelta):
         """
         Create a JSON Web Token (JWT) based on the given payload, secret key, and expiration time delta.
+        Every token gets a unique `jti` claim, which identifies it on the revocation list.
 
         :param payload: A dictionary containing the data to be encoded in the JWT.
         :param secret_key: The secret key to be used for encoding the JWT.
@@ -57,8 +63,22 @@ class JWTAuthenticator:
         :return: A JSON Web Token (JWT) string.
         """
         payload["exp"] = datetime.now(timezone.utc) + expires_delta
-        return jwt.encode(payload, secret_key,
-                          algorithm=self.ALGORITHM, )
+        payload.setdefault("jti", uuid.uuid4().hex)
+        with profiled_section("jwt"):
+            return jwt.encode(payload, secret_key,
+                              algorithm=self.ALGORITHM, )
+
+    def decode_payload(self, token: str, secret_key: str) -> dict:
+        """
+        Decode a JWT token and return its complete payload.
+
+        :param token: The JWT token to be decoded.
+        :param secret_key: The secret key used for encoding the token.
+        :return: The payload contained in the token.
+        :raises: jose.JWTError: If the signature of the token is invalid or the token has expired.
+        """
+        with profiled_section("jwt"):
+            return jwt.decode(token, secret_key, algorithms=[self.ALGORITHM])
 
     def decode_token(self, token: str, secret_key: str):
         """
@@ -70,7 +90,7 @@ class JWTAuthenticator:
         :raises: jwt.exceptions.InvalidSignatureError: If the signature of the token is invalid
                  jwt.exceptions.DecodeError: If the token is invalid or expired.
         """
-        payload = jwt.decode(token, secret_key, algorithms=[self.ALGORITHM])
+        payload = self.decode_payload(token, secret_key)
         sub_data: str = payload.get("sub")
         if sub_data is None:
             raise HTTPException(
@@ -104,6 +124,16 @@ class JWTAuthenticator:
         return self.create_token(payload=payload, secret_key=app_config.REFRESH_TOKEN_SECRET_KEY,
                                  expires_delta=refresh_token_expires)
 
+    def decode_refresh_token(self, token: str) -> dict:
+        """
+        Verify a refresh token and return its payload. Only HMAC work, no database or password hashing involved.
+
+        :param token: The refresh token to be decoded.
+        :return: The payload contained in the token.
+        :raises: jose.JWTError: If the signature of the token is invalid or the token has expired.
+        """
+        return self.decode_payload(token, app_config.REFRESH_TOKEN_SECRET_KEY)
+
 
 def urlsafe_base64_encode(s):
     """
@@ -125,7 +155,10 @@ def urlsafe_base64_decode(s):
         raise ValueError(e) from e
 
 
-def generate_otp(user_id: str, secret_key: str = app_config.PYOTP_SECRET_KEY) -> str:
+OTP_INTERVAL_SECONDS = 70
+
+
+def _user_totp(user_id: str, secret_key: str) -> pyotp.TOTP:
     # generate a token by encoding the user's id and adding a secret component
     user_secret = user_id.replace("-", "") + secret_key
 
@@ -136,25 +169,30 @@ def generate_otp(user_id: str, secret_key: str = app_config.PYOTP_SECRET_KEY) ->
     user_secret_base32 = base64.b32encode(secret_bytes)
     user_secret_base32_str = user_secret_base32.decode("utf-8")
 
-    # create a TOTP object with a 60-second validity period
-    totp = pyotp.TOTP(user_secret_base32_str, interval=70)
+    # create a TOTP object with a 70-second validity period
+    return pyotp.TOTP(user_secret_base32_str, interval=OTP_INTERVAL_SECONDS)
 
+
+def generate_otp(user_id: str, secret_key: str = app_config.PYOTP_SECRET_KEY) -> str:
     # generate and return a 6-digit OTP
-    return totp.now()
+    return _user_totp(user_id, secret_key).now()
 
 
-def verify_otp(user_id: str, otp: str, secret_key: str = app_config.PYOTP_SECRET_KEY) -> bool:
-    # generate a token by encoding the user's id and adding a secret component
-    user_secret = user_id.replace("-", "") + secret_key
-
-    # Convert string to bytes using UTF-8 encoding
-    secret_bytes = user_secret.encode("utf-8")
+def verify_otp_timecode(user_id: str, otp: str, secret_key: str = app_config.PYOTP_SECRET_KEY) -> Optional[int]:
+    """
+    Verify an OTP of the current time step.
 
-    # Encode bytes using base32 encoding
-    user_secret_base32 = base64.b32encode(secret_bytes)
-    user_secret_base32_str = user_secret_base32.decode("utf-8")
+    :param user_id: The id of the user the OTP was generated for.
+    :param otp: The OTP to verify.
+    :param secret_key: The secret component of the OTP.
+    :return: The time step the OTP is valid for, None if it is invalid.
+    """
+    totp = _user_totp(user_id, secret_key)
+    now = datetime.now()
+    if not pyotp.utils.strings_equal(str(otp), totp.at(now)):
+        return None
+    return totp.timecode(now)
 
-    # create a TOTP object with a 60-second validity period
-    totp = pyotp.TOTP(user_secret_base32_str, interval=70)
 
-    return totp.verify(otp)
+def verify_otp(user_id: str, otp: str, secret_key: str = app_config.PYOTP_SECRET_KEY) -> bool:
+    return verify_otp_timecode(user_id, otp, secret_key) is not None
@@ -0,0 +1,83 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from pydantic import EmailStr, errors
+from pydantic.networks import MAX_EMAIL_LENGTH, validate_email
+from pydantic.validators import str_validator
+
+from core.config import app_config
+from core.constants import PASSWORD_REGEX
+
+PASSWORD_MIN_LENGTH = 8
+PASSWORD_MAX_LENGTH = 12
+PASSWORD_SPECIAL_CHARACTERS = frozenset("@$!%*#?&")
+
+
+def is_valid_password(value: str) -> bool:
+    """
+    Check `value` against the password policy, with the same result as `re.match(PASSWORD_REGEX, value)`.
+
+    The regex runs a lookahead scan per character class before matching the body, this checks the length first and
+    classifies every character once. Like the regex, digits are Unicode decimal digits and one trailing newline is
+    accepted by `$`.
+    """
+    if value.endswith("\n"):
+        value = value[:-1]
+    if not PASSWORD_MIN_LENGTH <= len(value) <= PASSWORD_MAX_LENGTH:
+        return False
+    has_lower = has_upper = has_digit = has_special = False
+    for character in value:
+        if "a" <= character <= "z":
+            has_lower = True
+        elif "A" <= character <= "Z":
+            has_upper = True
+        elif character in PASSWORD_SPECIAL_CHARACTERS:
+            has_special = True
+        elif character.isdecimal():
+            has_digit = True
+        else:
+            return False
+    return has_lower and has_upper and has_digit and has_special
+
+
+class PasswordStr(str):
+    """
+    Password field validated by `is_valid_password`, raising the same error as `Field(regex=PASSWORD_REGEX)` and
+    documented with the same pattern.
+    """
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(pattern=PASSWORD_REGEX)
+
+    @classmethod
+    def __get_validators__(cls):
+        yield str_validator
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: str) -> str:
+        if not is_valid_password(value):
+            raise errors.StrRegexError(pattern=PASSWORD_REGEX)
+        return value
+
+
+@lru_cache(maxsize=app_config.EMAIL_VALIDATION_CACHE_SIZE)
+def _normalized_email(value: str) -> Optional[str]:
+    try:
+        return validate_email(value)[1]
+    except errors.EmailError:
+        return None
+
+
+class CachedEmailStr(EmailStr):
+    """
+    `EmailStr` remembering the result of the last `EMAIL_VALIDATION_CACHE_SIZE` addresses, valid or not, since login
+    and retried requests validate the same addresses over and over.
+    """
+
+    @classmethod
+    def validate(cls, value: str) -> str:
+        if len(value) > MAX_EMAIL_LENGTH or (email := _normalized_email(value)) is None:
+            raise errors.EmailError()
+        return email
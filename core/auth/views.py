@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from starlette import status
 
 from core.auth.schemas import UserRegistrationRequestSchema, UserRegistrationResponse, UserLoginResponse, \
-    UserLoginRequest, UserVerifyOTPRequest
-from core.auth.services import register, login, verify_otp_service
-from core.constants import REGISTER_SUMMARY, LOGIN_SUMMARY, OTP_VERIFICATION_SUMMARY
+    UserLoginRequest, UserVerifyOTPRequest, TokenRefreshRequest
+from core.auth.dependencies import get_access_token_payload
+from core.auth.services import register, login, verify_otp_service, refresh_token_service, logout
+from core.constants import REGISTER_SUMMARY, LOGIN_SUMMARY, OTP_VERIFICATION_SUMMARY, TOKEN_REFRESH_SUMMARY, \
+    LOGOUT_SUMMARY
 from core.database.core import get_db
 from core.response_models.auth_response_model import AuthenticationResponseModel, ResponseMessage
 
@@ -73,6 +75,59 @@ def api_user_login(request: UserLoginRequest, session: Session = Depends(get_db)
     return login(request, session)
 
 
+@auth_router.post("/api/token/refresh", status_code=status.HTTP_200_OK, response_model=UserLoginResponse,
+                  summary=TOKEN_REFRESH_SUMMARY, responses=_auth_response_model.token_refresh_response_model())
+def api_token_refresh(request: TokenRefreshRequest, session: Session = Depends(get_db)):
+    """
+    Endpoint for token refresh.
+    This endpoint exchanges a refresh token for a new access token and a new refresh token, without asking the user
+    for their password again. Every refresh token can be used once, reusing one revokes the whole login session.
+
+    Parameters:
+
+        request :
+            The incoming request object containing the refresh token.
+        session : Session
+            A SQLAlchemy Session object used to interact with the database.
+
+    Returns:
+
+        JSON response containing the new access and refresh tokens.
+
+    Raises:
+
+         HTTPException :
+            If the refresh token is invalid, expired, revoked or has already been used.
+    """
+    return refresh_token_service(request, session)
+
+
+@auth_router.post("/api/logout", status_code=status.HTTP_200_OK, response_model=ResponseMessage,
+                  summary=LOGOUT_SUMMARY, responses=_auth_response_model.logout_response_model())
+def api_user_logout(token_payload: dict = Depends(get_access_token_payload), session: Session = Depends(get_db)):
+    """
+    Endpoint for user logout.
+    This endpoint revokes the bearer access token of the request and the refresh tokens issued with it.
+
+    Parameters:
+
+        token_payload :
+            The payload of the authenticated bearer access token.
+        session : Session
+            A SQLAlchemy Session object used to interact with the database.
+
+    Returns:
+
+        JSON response containing a response message.
+
+    Raises:
+
+         HTTPException :
+            If the access token is missing, invalid, expired or already revoked.
+    """
+    return logout(token_payload, session)
+
+
 @auth_router.post("/api/verify/otp", status_code=status.HTTP_200_OK, response_model=ResponseMessage,
                   summary=OTP_VERIFICATION_SUMMARY, responses=_auth_response_model.otp_verification_response_model())
 def api_verify_otp(request: UserVerifyOTPRequest, session: Session = Depends(get_db)):
@@ -1,5 +1,6 @@
 import os
 from functools import lru_cache
+from typing import Dict, List
 
 from pydantic import BaseModel
 from pydantic import BaseSettings
@@ -33,6 +34,99 @@ class Config(BaseSettings):
 
     PYOTP_SECRET_KEY: str
 
+    """ Optional horizontal sharding, maps shard ids (0-4095) to database URLs. DATABASE_URL is not used when set."""
+    DATABASE_SHARDS: Dict[int, str] = {}
+    DATABASE_SHARD_VIRTUAL_NODES: int = 64
+
+    """ Logging, LOG_FORMAT is one of json or text."""
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SQL_LEVEL: str = "WARNING"
+    LOG_SQL_SAMPLE_RATE: float = 1.0
+
+    """ Per-request profiling, triggered by a signed X-Profile header or by PROFILING_SAMPLE_RATE."""
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET_KEY: str = ""
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    PROFILING_OUTPUT_DIR: str = "profiles"
+
+    """ Request validation, the number of email addresses whose validation result is cached."""
+    EMAIL_VALIDATION_CACHE_SIZE: int = 4096
+
+    """ Warmup steps run at startup, the readiness endpoint reports ready once they finished."""
+    WARMUP_ENABLED: bool = True
+    WARMUP_STEPS: List[str] = ["hasher", "jwt", "database", "validators", "openapi", "revocation"]
+    WARMUP_DATABASE_CONNECTIONS: int = 1
+
+    """ OpenAPI document, read from OPENAPI_PREBUILT_PATH when set and written by `python -m core.openapi`."""
+    OPENAPI_PREBUILT_PATH: str = ""
+    OPENAPI_CACHE_CONTROL: str = "no-cache"
+
+    """ Outbox delivery, OUTBOX_TRANSPORT is one of logging, file or smtp."""
+    OUTBOX_DISPATCHER_ENABLED: bool = True
+    OUTBOX_TRANSPORT: str = "logging"
+    OUTBOX_FILE_PATH: str = "outbox.jsonl"
+    OUTBOX_SMTP_HOST: str = "localhost"
+    OUTBOX_SMTP_PORT: int = 1025
+    OUTBOX_SMTP_SENDER: str = "no-reply@localhost"
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BACKOFF_SECONDS: float = 2.0
+    OUTBOX_CLAIM_TIMEOUT_SECONDS: float = 300.0
+    OUTBOX_FAILED_RETENTION_SECONDS: float = 604800.0
+    OUTBOX_PRUNE_INTERVAL_SECONDS: float = 3600.0
+
+    """ Admission control, auth paths run bcrypt and get their own, smaller concurrency limit."""
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_AUTH_PATHS: List[str] = ["/api/register", "/api/login"]
+    ADMISSION_AUTH_MAX_CONCURRENCY: int = os.cpu_count() or 1
+    ADMISSION_AUTH_MAX_QUEUE: int = 32
+    ADMISSION_DEFAULT_MAX_CONCURRENCY: int = 64
+    ADMISSION_DEFAULT_MAX_QUEUE: int = 128
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/api/health/live", "/api/health/ready"]
+
+    """ SQLite profile applied to SQLite database URLs, the cache size is in KiB and the mmap size in bytes."""
+    SQLITE_PROFILE_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_CACHE_SIZE_KIB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_POOL_SIZE: int = 8
+
+    """ Batched data migrations, see core.database.batched_migration."""
+    MIGRATION_BATCH_SIZE: int = 1000
+    MIGRATION_BATCH_THROTTLE_SECONDS: float = 0.05
+
+    """ Statement timeout applied to every database transaction, 0 disables it (PostgreSQL only)."""
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+
+    """ Token revocation list, other workers see a revocation within REVOCATION_SYNC_INTERVAL_SECONDS."""
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_INTERVAL_SECONDS: float = 5.0
+    REVOCATION_PRUNE_INTERVAL_SECONDS: float = 3600.0
+
+    """ OTP verification, the number of used OTPs remembered to reject replays."""
+    OTP_REPLAY_GUARD_MAX_ENTRIES: int = 100000
+
+    """ Idempotency-Key support of POST routes, IDEMPOTENCY_BACKEND is one of memory or database.
+    Stored responses are replayed as they are, routes issuing or rotating tokens must not be listed. Request
+    fingerprints are keyed with IDEMPOTENCY_SECRET_KEY, derived from ACCESS_TOKEN_SECRET_KEY when empty."""
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_PATHS: List[str] = ["/api/register"]
+    IDEMPOTENCY_SECRET_KEY: str = ""
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: float = 10.0
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: float = 60.0
+
     class Config:
         env_nested_delimiter = '__'
         env_file = ".env"
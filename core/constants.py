@@ -1,11 +1,31 @@
 REGISTER_SUMMARY = "User Registration"
 LOGIN_SUMMARY = "User Login"
 OTP_VERIFICATION_SUMMARY = "User OTP Verification"
+TOKEN_REFRESH_SUMMARY = "Token Refresh"
+LOGOUT_SUMMARY = "User Logout"
+LIVENESS_SUMMARY = "Liveness Probe"
+READINESS_SUMMARY = "Readiness Probe"
 PASSWORD_REGEX = r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*#?&])[A-Za-z\d@$!#%*?&]{8,12}$"
 ERR_MSG_USER_ALREADY_EXIST = "user with this email already exists."
 USER_REGISTRATION_SUCCESS = "User Register Successfully."
 USER_LOGIN_SUCCESS = "User Login Successfully."
 USER_OTP_VERIFICATION_FAILED = "Invalid otp."
 USER_OTP_VERIFICATION_SUCCESS = "Account activated successfully, please login."
+USER_OTP_ALREADY_USED = "This otp has already been used."
+USER_OTP_ACCOUNT_NOT_ACTIVATED = "This account does not exist or is already active."
 ERR_EMAIL_INCORRECT = "please enter valid email!"
 ERR_PASSWORD_INCORRECT = "incorrect password"
+TOKEN_REFRESH_SUCCESS = "Token Refreshed Successfully."
+ERR_REFRESH_TOKEN_INVALID = "invalid or expired refresh token"
+ERR_REFRESH_TOKEN_REUSED = "refresh token has already been used, please login again"
+ERR_ACCESS_TOKEN_INVALID = "could not validate credentials"
+USER_LOGOUT_SUCCESS = "User Logout Successfully."
+SERVICE_ALIVE = "Service is alive."
+SERVICE_READY = "Service is ready."
+SERVICE_WARMING_UP = "Service is warming up."
+SERVICE_OVERLOADED = "Service is overloaded, please retry later."
+OTP_MESSAGE_SUBJECT = "Verify your account"
+OTP_MESSAGE_BODY = "Your verification code is {otp}, submit it with uid {uid} to activate your account."
+ERR_IDEMPOTENCY_KEY_INVALID = "Idempotency-Key must be between 1 and 255 characters."
+ERR_IDEMPOTENCY_KEY_CONFLICT = "Idempotency-Key has already been used for a different request."
+ERR_IDEMPOTENCY_KEY_IN_PROGRESS = "A request with this Idempotency-Key is still being processed."
@@ -0,0 +1,107 @@
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import Connection
+from sqlalchemy.sql import ColumnElement
+
+from core.config import app_config
+
+# Under the `alembic` logger, so the progress is shown with the logging configuration of alembic.ini.
+logger = logging.getLogger("alembic.batched_migration")
+
+PROGRESS_TABLE_NAME = "batched_migration_progress"
+
+# Created on demand by the first batched migration and left out of autogenerate, see migrations/env.py.
+progress_table = sa.Table(
+    PROGRESS_TABLE_NAME, sa.MetaData(),
+    sa.Column("name", sa.String(255), primary_key=True),
+    sa.Column("last_key", sa.JSON),
+    sa.Column("rows_done", sa.Integer, nullable=False, default=0),
+    sa.Column("updated_at", sa.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow),
+)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def run_batched_migration(name: str, key: sa.ColumnClause, apply: Callable[[Connection, ColumnElement], None],
+                          chunk_size: Optional[int] = None, throttle: Optional[float] = None) -> int:
+    """
+    Apply a data migration to a table chunk by chunk, in primary key order, from within an alembic revision.
+
+    Each chunk covers the next `chunk_size` keys and is passed to `apply` as a filter selecting its key range. The
+    statements `apply` executes and the checkpoint of the chunk are committed together in one transaction, on a
+    separate connection of the migration's engine, so locks are only held for one chunk. The revision's preceding
+    operations are committed before the first chunk, they have to be skipped when a resumed run finds them applied
+    already. The migration sleeps `throttle` seconds between chunks to leave room for the application's queries and
+    logs its progress with an ETA.
+
+    The last committed chunk is checkpointed under `name` in the `batched_migration_progress` table, an interrupted
+    migration resumes after it when the revision is run again, without applying any committed chunk twice. The
+    checkpoint is removed once the migration has finished. Offline (`--sql`) mode is not supported.
+
+    :param name: A name unique across revisions, e.g. `<revision>_<step>`.
+    :param key: The primary key column of the table, or another unique and sortable column with JSON serialisable
+        values.
+    :param apply: Called with the connection and the filter of each chunk, it must only use that connection.
+    :param chunk_size: The number of rows per chunk, `MIGRATION_BATCH_SIZE` by default.
+    :param throttle: The pause between chunks in seconds, `MIGRATION_BATCH_THROTTLE_SECONDS` by default.
+    :return: The number of rows processed by this run.
+    """
+    context = op.get_context()
+    if context.as_sql:
+        raise RuntimeError(f"Batched migration '{name}' cannot run in offline mode.")
+    chunk_size = chunk_size or app_config.MIGRATION_BATCH_SIZE
+    throttle = app_config.MIGRATION_BATCH_THROTTLE_SECONDS if throttle is None else throttle
+
+    # The autocommit block commits the revision's preceding operations and leaves the migration's connection idle,
+    # the chunks run in transactions of their own connection.
+    with context.autocommit_block(), op.get_bind().engine.connect() as connection:
+        with connection.begin():
+            progress_table.create(connection, checkfirst=True)
+            checkpoint = connection.execute(sa.select(progress_table).where(progress_table.c.name == name)).first()
+            if checkpoint is None:
+                last_key, rows_done = None, 0
+                connection.execute(progress_table.insert().values(name=name, last_key=None, rows_done=0))
+            else:
+                last_key, rows_done = checkpoint.last_key, checkpoint.rows_done
+                logger.info("Batched migration '%s' resumes after %s rows.", name, rows_done)
+
+            remaining_filter = key > last_key if last_key is not None else sa.true()
+            rows_total = rows_done + connection.execute(
+                sa.select(sa.func.count()).select_from(key.table).where(remaining_filter)).scalar()
+        started, rows_run = time.monotonic(), 0
+        while True:
+            with connection.begin():
+                query = sa.select(key).order_by(key).limit(chunk_size)
+                if last_key is not None:
+                    query = query.where(key > last_key)
+                keys = connection.execute(query).scalars().all()
+                if not keys:
+                    break
+                apply(connection, sa.and_(key >= keys[0], key <= keys[-1]))
+                connection.execute(progress_table.update().where(progress_table.c.name == name)
+                                   .values(last_key=keys[-1], rows_done=rows_done + len(keys)))
+
+            last_key = keys[-1]
+            rows_done += len(keys)
+            rows_run += len(keys)
+            rate = rows_run / max(time.monotonic() - started, 1e-9)
+            logger.info("Batched migration '%s': %s/%s rows (%.1f%%), %.0f rows/s, ETA %s.", name, rows_done,
+                        rows_total, 100 * rows_done / max(rows_total, 1), rate,
+                        _format_duration(max(rows_total - rows_done, 0) / rate))
+            if throttle:
+                time.sleep(throttle)
+
+        with connection.begin():
+            connection.execute(progress_table.delete().where(progress_table.c.name == name))
+    logger.info("Batched migration '%s' finished, %s rows in %s.", name, rows_run,
+                _format_duration(time.monotonic() - started))
+    return rows_run
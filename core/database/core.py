@@ -6,38 +6,92 @@ from typing import Any
 
 from pydantic import BaseModel
 from pydantic.error_wrappers import ErrorWrapper, ValidationError
-from sqlalchemy import create_engine, inspect, Engine, event
+from sqlalchemy import create_engine, inspect, make_url, Engine, event
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
+from sqlalchemy.ext.horizontal_shard import ShardedSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from starlette.requests import Request
 
 from core.config import app_config
+from core.database.sharding import get_database_urls, shard_router
 from core.exceptions import NotFoundError
 
-engine = create_engine(
-    app_config.DATABASE_URL
-)
 
-# Useful for identifying slow or n + 1 queries. But doesn't need to be enabled in production.
-logging.basicConfig()
+def apply_sqlite_profile(dbapi_connection, connection_record):
+    """
+    Configure a new SQLite connection for concurrent use: WAL lets readers run alongside the single writer and
+    `synchronous=NORMAL` syncs on checkpoints instead of on every commit, which stays durable against application
+    crashes and only risks the last transactions on power loss.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode = {app_config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {app_config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size = -{int(app_config.SQLITE_CACHE_SIZE_KIB)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(app_config.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(app_config.SQLITE_BUSY_TIMEOUT_MS)}")
+    finally:
+        cursor.close()
+
+
+def make_engine(url: str) -> Engine:
+    """
+    Create the engine of a database URL.
+
+    SQLite databases get the SQLite profile, see `apply_sqlite_profile`, unless `SQLITE_PROFILE_ENABLED` is off. File
+    databases use a pool of `SQLITE_POOL_SIZE` connections shared between threads, in-memory databases a single
+    connection, since every connection would otherwise open its own empty database.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or not app_config.SQLITE_PROFILE_ENABLED:
+        return create_engine(url)
+    connect_args = {"check_same_thread": False, "timeout": app_config.SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if url.database in (None, "", ":memory:"):
+        sqlite_engine = create_engine(url, poolclass=StaticPool, connect_args=connect_args)
+    else:
+        sqlite_engine = create_engine(url, poolclass=QueuePool, pool_size=app_config.SQLITE_POOL_SIZE,
+                                      connect_args=connect_args)
+    event.listen(sqlite_engine, "connect", apply_sqlite_profile)
+    return sqlite_engine
+
+
+# One engine per shard, a single one keyed 0 when sharding is disabled. `engine` is the first shard.
+engines = {shard_id: make_engine(url) for shard_id, url in get_database_urls().items()}
+engine = engines[min(engines)]
+
+# Useful for identifying slow or n + 1 queries. But doesn't need to be enabled in production, the level is set by
+# LOG_SQL_LEVEL and the records are sampled by LOG_SQL_SAMPLE_RATE.
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 @event.listens_for(Engine, "before_cursor_execute")
 def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-    conn.info.setdefault("query_start_time", []).append(time.time())
-    logger.debug("Start Query: %s", statement)
+    if logger.isEnabledFor(logging.DEBUG):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+        logger.debug("Start Query: %s", statement)
 
 
 @event.listens_for(Engine, "after_cursor_execute")
 def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-    total = time.time() - conn.info["query_start_time"].pop(-1)
-    logger.debug("Query Complete!")
-    logger.debug("Total Time: %f", total)
+    if query_start_time := conn.info.get("query_start_time"):
+        total = time.perf_counter() - query_start_time.pop(-1)
+        logger.debug("Query Complete!", extra={"duration": total})
+
+
+if shard_router is None:
+    SessionLocal = sessionmaker(bind=engine)
+else:
+    SessionLocal = sessionmaker(class_=ShardedSession, shards=engines, shard_chooser=shard_router.shard_chooser,
+                                identity_chooser=shard_router.identity_chooser,
+                                execute_chooser=shard_router.execute_chooser)
 
 
-SessionLocal = sessionmaker(bind=engine)
+@event.listens_for(SessionLocal, "after_begin")
+def set_statement_timeout(session, transaction, connection):
+    """Bound every statement of the transaction by `DB_STATEMENT_TIMEOUT_MS`, so overload cannot pile up queries."""
+    if app_config.DB_STATEMENT_TIMEOUT_MS and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(app_config.DB_STATEMENT_TIMEOUT_MS)}")
 
 
 def resolve_table_name(name):
@@ -0,0 +1,47 @@
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+
+def get_query_plan(statement: Select, session: Session) -> List[str]:
+    """
+    Return the database's query plan for `statement` as a list of lines.
+
+    Supported on SQLite (`EXPLAIN QUERY PLAN`) and PostgreSQL (`EXPLAIN`). On PostgreSQL sequential scans are
+    disabled for the duration of the transaction, so the plan reflects whether an index *can* serve the query even
+    on a table too small for the planner to prefer it.
+    """
+    dialect = session.get_bind().dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    if dialect.name == "sqlite":
+        rows = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        return [row[-1] for row in rows]
+    if dialect.name == "postgresql":
+        session.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = session.execute(text(f"EXPLAIN {compiled}")).all()
+        return [row[0] for row in rows]
+    raise NotImplementedError(f"Query plans are not supported for the '{dialect.name}' dialect.")
+
+
+def assert_index_used(statement: Select, index_name: str, session: Session) -> None:
+    """
+    Raise `AssertionError` unless the query plan for `statement` uses `index_name`.
+    """
+    plan = get_query_plan(statement, session)
+    if not any(index_name in line for line in plan):
+        raise AssertionError(f"Index '{index_name}' is not used, query plan: {plan}")
+
+
+if __name__ == "__main__":
+    from sqlalchemy import select
+
+    from core.auth.models import User
+    from core.database.core import SessionLocal
+
+    with SessionLocal() as db_session:
+        lookup = select(User).filter(*User.ignore_case_filters(User.email, "someone@example.com")).limit(1)
+        assert_index_used(lookup, "ix_user_email_lower", db_session)
+        db_session.rollback()
+    print("User email lookup uses ix_user_email_lower.")
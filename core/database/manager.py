@@ -1,25 +1,91 @@
+import os
+import time
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+from sqlalchemy import func, update
+from sqlalchemy.ext.horizontal_shard import set_shard_id
 from sqlalchemy.orm import Session
 
 from core.database.core import Base
+from core.database.sharding import embed_shard_id, shard_for
 from core.utils import to_dict
 
 DataObject = Dict[str, Any]
 
 
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUID (version 7, RFC 9562).
+
+    The 48 most significant bits hold the unix timestamp in milliseconds, so new keys are appended to the right-hand
+    side of the primary key index instead of landing on random pages.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand_a = int.from_bytes(os.urandom(2), "big") & 0x0FFF
+    rand_b = int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= rand_a << 64
+    value |= 0b10 << 62
+    value |= rand_b
+    return uuid.UUID(int=value)
+
+
 class QueryManager:
+    # Generator used by `create_with_uuid`, models override it to select their key strategy.
+    __id_generator__ = staticmethod(uuid.uuid4)
+    # Attribute routing rows between database shards, models without one are routed by their primary key.
+    __shard_key__: Optional[str] = None
 
     @classmethod
-    def get_single_item_by_filters(cls, fields: list, session: Session) -> Any:
+    def get_single_item_by_filters(cls, fields: list, session: Session, shard_key: Any = None) -> Any:
+        """
+        Return the first row matching `fields`. Pass the shard key or primary key value the filters match on as
+        `shard_key` to query a single shard, every shard is queried otherwise.
+        """
         item: Base = session.query(cls).filter(*fields)
+        if (shard_id := shard_for(shard_key)) is not None:
+            item = item.options(set_shard_id(shard_id))
         item: Any = item.first()
         return item
 
+    @classmethod
+    def ignore_case_filters(cls, field, value: str) -> list:
+        """
+        Filters matching `field` case-insensitively, written so the `lower(field)` functional index (partial on
+        `field IS NOT NULL`) can serve them.
+        """
+        return [func.lower(field) == value.lower(), field.isnot(None)]
+
+    @classmethod
+    def get_single_item_ignore_case(cls, field, value: str, session: Session) -> Any:
+        shard_key = value.lower() if field.key == cls.__shard_key__ else None
+        return cls.get_single_item_by_filters(cls.ignore_case_filters(field, value), session, shard_key)
+
+    @classmethod
+    def update_by_filters(cls, fields: list, values: DataObject, session: Session, shard_key: Any = None,
+                          returning: Optional[list] = None) -> int:
+        """
+        Update the rows matching `fields` in a single statement and return the number of updated rows. `shard_key`
+        routes the statement like in `get_single_item_by_filters`.
+
+        With `returning` columns the updated rows are counted from `UPDATE ... RETURNING`, which unlike the rowcount
+        is exact on every driver. Dialects without `UPDATE ... RETURNING` fall back to the rowcount.
+        """
+        statement = update(cls).where(*fields).values(**values).execution_options(synchronize_session=False)
+        shard_id = shard_for(shard_key)
+        bind_arguments = {"shard_id": shard_id} if shard_id is not None else None
+        if returning and session.get_bind(cls.__mapper__, shard_id=shard_id).dialect.update_returning:
+            return len(session.execute(statement.returning(*returning), bind_arguments=bind_arguments).all())
+        return session.execute(statement, bind_arguments=bind_arguments).rowcount
+
     @classmethod
     def create_with_uuid(cls, data: DataObject, session: Session) -> DataObject:
-        data.update({"id": str(uuid.uuid4())})
+        item_id = cls.__id_generator__()
+        if cls.__shard_key__ and (shard_id := shard_for(data.get(cls.__shard_key__))) is not None:
+            item_id = embed_shard_id(item_id, shard_id)
+        data.update({"id": str(item_id)})
         item: Base = cls(**data)
         session.add(item)
         return item
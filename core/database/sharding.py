@@ -0,0 +1,130 @@
+import bisect
+import hashlib
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Mapper, ORMExecuteState
+
+from core.config import app_config
+
+# Shard ids are embedded in the 12 `rand_a` bits of UUIDv7 ids.
+MAX_SHARDS = 1 << 12
+_SHARD_ID_SHIFT = 64
+_SHARD_ID_MASK = (MAX_SHARDS - 1) << _SHARD_ID_SHIFT
+
+
+def embed_shard_id(value: uuid.UUID, shard_id: int) -> uuid.UUID:
+    """
+    Store `shard_id` in the `rand_a` bits of the UUIDv7 `value`, other UUID versions are returned unchanged.
+
+    The timestamp bits are left untouched, so the ids of every shard stay time-ordered.
+    """
+    if value.version != 7:
+        return value
+    return uuid.UUID(int=(value.int & ~_SHARD_ID_MASK) | (shard_id << _SHARD_ID_SHIFT))
+
+
+def shard_id_from_uuid(value: Any) -> Optional[int]:
+    """
+    Return the shard id embedded in a UUIDv7 id, or None if `value` is not a UUIDv7.
+    """
+    try:
+        parsed = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    except ValueError:
+        return None
+    if parsed.version != 7:
+        return None
+    return (parsed.int & _SHARD_ID_MASK) >> _SHARD_ID_SHIFT
+
+
+class ShardRouter:
+    """
+    Consistent-hash router of rows between database shards.
+
+    Every shard owns `virtual_nodes` points of a hash ring, a key belongs to the shard owning the next point, so adding
+    a shard only moves the keys of the ring segments it takes over. Models route by their `__shard_key__` attribute
+    (the normalised email for users), or by their primary key if they have none. UUIDv7 ids generated by
+    `QueryManager.create_with_uuid` carry the shard of their row, so lookups by id go to a single shard as well.
+
+    Rows are not moved when the shard map changes, rebalance them before adding shards to a populated cluster.
+    """
+
+    def __init__(self, shard_ids: List[int], virtual_nodes: int):
+        if not shard_ids:
+            raise ValueError("At least one shard is required.")
+        if not all(0 <= shard_id < MAX_SHARDS for shard_id in shard_ids):
+            raise ValueError(f"Shard ids must be between 0 and {MAX_SHARDS - 1}.")
+        self.shard_ids = sorted(shard_ids)
+        ring = sorted((self._hash(f"{shard_id}:{node}"), shard_id)
+                      for shard_id in self.shard_ids for node in range(virtual_nodes))
+        self._ring_hashes = [point for point, _ in ring]
+        self._ring_shards = [shard_id for _, shard_id in ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def shard_for_key(self, key: str) -> int:
+        """
+        Return the shard owning the ring segment of `key`.
+        """
+        index = bisect.bisect(self._ring_hashes, self._hash(key)) % len(self._ring_hashes)
+        return self._ring_shards[index]
+
+    def shard_for_value(self, value: Any) -> Optional[int]:
+        """
+        Return the shard of a shard key or primary key value: the shard embedded in UUIDv7 ids, the hashed shard of
+        any other value. None means the shard is unknown and every shard has to be queried.
+        """
+        if value is None:
+            return None
+        if (shard_id := shard_id_from_uuid(value)) is not None:
+            return shard_id if shard_id in self.shard_ids else None
+        return self.shard_for_key(str(value))
+
+    def shard_chooser(self, mapper: Optional[Mapper], instance: Any, clause=None) -> int:
+        """Choose the shard a new instance is written to."""
+        if mapper is None or instance is None:
+            return self.shard_ids[0]
+        value = None
+        if shard_key := getattr(mapper.class_, "__shard_key__", None):
+            value = getattr(instance, shard_key)
+        if value is None:
+            value = ":".join(str(key) for key in mapper.primary_key_from_instance(instance))
+        shard_id = self.shard_for_value(value)
+        return self.shard_ids[0] if shard_id is None else shard_id
+
+    def identity_chooser(self, mapper: Mapper, primary_key: List[Any], **kwargs) -> List[int]:
+        """Choose the shards to look an instance up by primary key in."""
+        shard_id = self.shard_for_value(primary_key[0] if len(primary_key) == 1 else ":".join(map(str, primary_key)))
+        return self.shard_ids if shard_id is None else [shard_id]
+
+    def execute_chooser(self, context: ORMExecuteState) -> List[int]:
+        """Choose the shards of statements executed without a shard, see `QueryManager` for routed queries."""
+        return self.shard_ids
+
+
+def get_shard_router() -> Optional[ShardRouter]:
+    """
+    Build the router of `DATABASE_SHARDS`, None when sharding is disabled.
+    """
+    if not app_config.DATABASE_SHARDS:
+        return None
+    return ShardRouter(list(app_config.DATABASE_SHARDS), app_config.DATABASE_SHARD_VIRTUAL_NODES)
+
+
+def get_database_urls() -> Dict[int, str]:
+    """
+    Return the database URL of every shard, the single `DATABASE_URL` as shard 0 when sharding is disabled.
+    """
+    return dict(app_config.DATABASE_SHARDS) or {0: app_config.DATABASE_URL}
+
+
+shard_router = get_shard_router()
+
+
+def shard_for(value: Any) -> Optional[int]:
+    """
+    Return the shard of a shard key or primary key value, None when sharding is disabled or the shard is unknown.
+    """
+    return None if shard_router is None else shard_router.shard_for_value(value)
@@ -0,0 +1,54 @@
+import uuid
+
+from sqlalchemy import BINARY
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+class UUIDType(TypeDecorator):
+    """
+    Compact UUID column type.
+
+    Values are exchanged with the application as canonical hyphenated strings, so models, schemas and services keep
+    working with ``str`` ids, while the database stores them in 16 bytes.
+
+    Storage:
+        native : The dialect's native ``UUID`` type where available (PostgreSQL), ``BINARY(16)`` elsewhere.
+        binary : The 16 raw bytes, in ``BYTEA`` on PostgreSQL, which has no fixed-length binary type, and in
+            ``BINARY(16)`` elsewhere.
+    """
+    impl = BINARY(16)
+    cache_ok = True
+
+    STORAGE_NATIVE = "native"
+    STORAGE_BINARY = "binary"
+
+    def __init__(self, storage: str = STORAGE_NATIVE):
+        if storage not in (self.STORAGE_NATIVE, self.STORAGE_BINARY):
+            raise ValueError(f"Unknown UUID storage '{storage}', expected 'native' or 'binary'.")
+        self.storage = storage
+        super().__init__()
+
+    def _uses_native(self, dialect) -> bool:
+        return self.storage == self.STORAGE_NATIVE and dialect.name == "postgresql"
+
+    def load_dialect_impl(self, dialect):
+        if self._uses_native(dialect):
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.BYTEA())
+        return dialect.type_descriptor(BINARY(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value if self._uses_native(dialect) else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
@@ -14,3 +14,8 @@ class ExistsError(Exception):
 class NotFoundError(Exception):
     def __init__(self, msg):
         self.msg = msg
+
+
+class UnauthorizedException(Exception):
+    def __init__(self, msg):
+        self.msg = msg
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from core.constants import LIVENESS_SUMMARY, READINESS_SUMMARY, SERVICE_ALIVE, SERVICE_READY, SERVICE_WARMING_UP
+from core.response_models.auth_response_model import ResponseMessage
+
+health_router = APIRouter(
+    tags=["Health"],
+)
+
+
+@health_router.get("/api/health/live", status_code=status.HTTP_200_OK, response_model=ResponseMessage,
+                   summary=LIVENESS_SUMMARY)
+def api_liveness():
+    """
+    Liveness probe.
+    Responds as soon as the worker accepts requests.
+    """
+    return {"message": SERVICE_ALIVE}
+
+
+@health_router.get("/api/health/ready", status_code=status.HTTP_200_OK, response_model=ResponseMessage,
+                   summary=READINESS_SUMMARY,
+                   responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ResponseMessage}})
+def api_readiness(request: Request):
+    """
+    Readiness probe.
+    Responds with 503 until the startup warmup has finished, so load balancers only route traffic to warm workers.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"message": SERVICE_WARMING_UP})
+    return {"message": SERVICE_READY}
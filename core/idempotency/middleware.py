@@ -0,0 +1,121 @@
+import hashlib
+import hmac
+from typing import Iterable
+
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import app_config
+from core.constants import ERR_IDEMPOTENCY_KEY_CONFLICT, ERR_IDEMPOTENCY_KEY_IN_PROGRESS, \
+    ERR_IDEMPOTENCY_KEY_INVALID
+from core.idempotency.stores import IdempotencyStore, StoredResponse, NEW, REPLAY, CONFLICT
+
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def get_fingerprint_key() -> bytes:
+    """
+    Return `IDEMPOTENCY_SECRET_KEY`, or a key derived from `ACCESS_TOKEN_SECRET_KEY` when it is not set.
+    """
+    if app_config.IDEMPOTENCY_SECRET_KEY:
+        return app_config.IDEMPOTENCY_SECRET_KEY.encode("utf-8")
+    return hmac.new(app_config.ACCESS_TOKEN_SECRET_KEY.encode("utf-8"), b"idempotency-fingerprint",
+                    hashlib.sha256).digest()
+
+
+class IdempotencyMiddleware:
+    """
+    `Idempotency-Key` header support for POST requests.
+
+    The response of the first request with a key is stored and returned for every retry with the same key and the
+    same request (body and Authorization header), without processing it again. Retries that arrive while the first
+    request is still running wait for its response. Responses with a 5xx status code are not stored, so the request
+    can be retried.
+
+    A replay returns the stored response as it is, so routes whose responses must not be returned twice, such as
+    issued or rotated tokens, must not be covered. Requests are fingerprinted with an HMAC keyed with
+    `fingerprint_key`, stored fingerprints do not reveal the passwords in the request bodies.
+    """
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, paths: Iterable[str], fingerprint_key: bytes):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.fingerprint_key = fingerprint_key
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if (idempotency_key := headers.get(IDEMPOTENCY_KEY_HEADER)) is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            await self._respond(status.HTTP_400_BAD_REQUEST, ERR_IDEMPOTENCY_KEY_INVALID, scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        fingerprint = hmac.new(self.fingerprint_key, headers.get("authorization", "").encode("latin-1") + b"\n" + body,
+                               hashlib.sha256).hexdigest()
+
+        key = f"{scope['path']}:{idempotency_key}"
+        state, stored_response = await self.store.begin(key, fingerprint)
+        if state == REPLAY:
+            await self._replay(stored_response, send)
+        elif state == CONFLICT:
+            await self._respond(status.HTTP_422_UNPROCESSABLE_ENTITY, ERR_IDEMPOTENCY_KEY_CONFLICT, scope, receive,
+                                send)
+        elif state == NEW:
+            await self._process(key, body, scope, receive, send)
+        else:
+            await self._respond(status.HTTP_409_CONFLICT, ERR_IDEMPOTENCY_KEY_IN_PROGRESS, scope, receive, send)
+
+    async def _process(self, key: str, body: bytes, scope: Scope, receive: Receive, send: Send) -> None:
+        body_sent = False
+        response = StoredResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, headers=[], body=b"")
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response.status_code = message["status"]
+                response.headers = [(name.decode("latin-1"), value.decode("latin-1"))
+                                    for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response.body += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+            await self.store.release(key)
+        else:
+            await self.store.complete(key, response)
+
+    @staticmethod
+    async def _replay(response: StoredResponse, send: Send) -> None:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.headers]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+    @staticmethod
+    async def _respond(status_code: int, message: str, scope: Scope, receive: Receive, send: Send) -> None:
+        await JSONResponse(status_code=status_code, content={"message": message})(scope, receive, send)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Integer, JSON, LargeBinary, String
+
+from core.database.core import Base
+from core.database.manager import QueryManager
+
+
+class IdempotencyRecord(Base, QueryManager):
+    """
+    Model for storing the responses of requests sent with an `Idempotency-Key` header.
+
+    A record without a status code belongs to a request that is still being processed.
+
+    Fields:
+        key (str): The path of the request and its idempotency key.
+        fingerprint (str): The hash of the request the key was first used with.
+        status_code (int): The status code of the stored response.
+        headers (list): The headers of the stored response.
+        body (bytes): The body of the stored response.
+        expires_at (datetime): The time after which the key can be used again.
+    """
+    __tablename__ = "idempotency_record"
+
+    key = Column(String(320), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    headers = Column(JSON)
+    body = Column(LargeBinary)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from core.config import app_config
+from core.database.core import SessionLocal
+from core.database.sharding import shard_for
+from core.idempotency.models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+NEW = "new"
+REPLAY = "replay"
+CONFLICT = "conflict"
+IN_PROGRESS = "in_progress"
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyStore:
+    """
+    Base class of idempotency key stores.
+
+    `begin` claims a key for a request with the given fingerprint and returns one of:
+        NEW : The key was free, the caller processes the request and calls `complete` or `release`.
+        REPLAY : The key has a stored response for the same request, returned alongside.
+        CONFLICT : The key was used with a different request.
+        IN_PROGRESS : The first request with the key did not finish within `wait_timeout`.
+
+    Concurrent duplicates wait for the first request instead of being processed again.
+    """
+
+    def __init__(self, ttl: float, wait_timeout: float):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+
+    async def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        raise NotImplementedError
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        raise NotImplementedError
+
+    async def release(self, key: str) -> None:
+        raise NotImplementedError
+
+
+@dataclass
+class _MemoryEntry:
+    fingerprint: str
+    expires_at: float
+    done: asyncio.Event
+    response: Optional[StoredResponse] = None
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """
+    Idempotency key store in a bounded, insertion-ordered dictionary of the worker.
+
+    Entries expire after `ttl` seconds; once more than `max_entries` are stored the oldest finished ones are evicted.
+    """
+
+    def __init__(self, ttl: float, wait_timeout: float, max_entries: int):
+        super().__init__(ttl, wait_timeout)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        # Entries share one TTL, so the oldest entry is always the first to expire.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and (len(self._entries) < self.max_entries or not entry.done.is_set()):
+                break
+            del self._entries[key]
+
+    async def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        if time.monotonic() - self._swept_at >= self.sweep_interval:
+            # Set before sweeping, concurrent requests of the worker skip the sweep.
+            self._swept_at = time.monotonic()
+            try:
+                await run_in_threadpool(self._sweep)
+            except Exception:
+                logger.exception("Idempotency record sweep failed.")
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                self._entries.pop(key, None)
+                self._evict(now)
+                self._entries[key] = _MemoryEntry(fingerprint, now + self.ttl, asyncio.Event())
+                return NEW, None
+            if entry.fingerprint != fingerprint:
+                return CONFLICT, None
+            if entry.response is not None:
+                return REPLAY, entry.response
+            try:
+                await asyncio.wait_for(entry.done.wait(), deadline - now)
+            except asyncio.TimeoutError:
+                return IN_PROGRESS, None
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        if (entry := self._entries.get(key)) is not None:
+            entry.response = response
+            entry.done.set()
+
+    async def release(self, key: str) -> None:
+        if (entry := self._entries.pop(key, None)) is not None:
+            entry.done.set()
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """
+    Idempotency key store in the `idempotency_record` table, shared by all workers.
+
+    The key is claimed by inserting its record, the primary key lets exactly one request win. Duplicates poll the
+    record every `poll_interval` seconds until the response is stored. A claimed record expires after `lease`
+    seconds until its response is stored, so the key is freed again if the worker processing it dies. Expired
+    records are deleted by `begin` at most every `sweep_interval` seconds.
+    """
+
+    def __init__(self, ttl: float, wait_timeout: float, lease: float = 60.0, poll_interval: float = 0.05,
+                 sweep_interval: float = 60.0):
+        super().__init__(ttl, wait_timeout)
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self._swept_at = time.monotonic()
+
+    @staticmethod
+    def _sweep() -> int:
+        with SessionLocal() as session:
+            deleted = session.execute(delete(IdempotencyRecord).where(
+                IdempotencyRecord.expires_at <= datetime.utcnow())).rowcount
+            session.commit()
+        return deleted
+
+    def _claim(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        now = datetime.utcnow()
+        with SessionLocal() as session:
+            session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.key == key,
+                                                            IdempotencyRecord.expires_at <= now),
+                            bind_arguments={"shard_id": shard_for(key)})
+            session.add(IdempotencyRecord(key=key, fingerprint=fingerprint,
+                                          expires_at=now + timedelta(seconds=self.lease)))
+            try:
+                session.commit()
+                return NEW, None
+            except IntegrityError:
+                session.rollback()
+            record = IdempotencyRecord.get_single_item_by_filters([IdempotencyRecord.key == key], session, key)
+            if record is None:
+                return self._claim(key, fingerprint)
+            if record.fingerprint != fingerprint:
+                return CONFLICT, None
+            if record.status_code is None:
+                return IN_PROGRESS, None
+            return REPLAY, StoredResponse(record.status_code, [tuple(header) for header in record.headers],
+                                          record.body)
+
+    async def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[StoredResponse]]:
+        if time.monotonic() - self._swept_at >= self.sweep_interval:
+            # Set before sweeping, concurrent requests of the worker skip the sweep.
+            self._swept_at = time.monotonic()
+            try:
+                await run_in_threadpool(self._sweep)
+            except Exception:
+                logger.exception("Idempotency record sweep failed.")
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            state, response = await run_in_threadpool(self._claim, key, fingerprint)
+            if state != IN_PROGRESS or time.monotonic() >= deadline:
+                return state, response
+            await asyncio.sleep(self.poll_interval)
+
+    def _execute(self, key: str, statement) -> None:
+        with SessionLocal() as session:
+            session.execute(statement, bind_arguments={"shard_id": shard_for(key)})
+            session.commit()
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        statement = update(IdempotencyRecord).where(IdempotencyRecord.key == key).values(
+            status_code=response.status_code, headers=[list(header) for header in response.headers],
+            body=response.body, expires_at=datetime.utcnow() + timedelta(seconds=self.ttl))
+        await run_in_threadpool(self._execute, key, statement)
+
+    async def release(self, key: str) -> None:
+        await run_in_threadpool(self._execute, key, delete(IdempotencyRecord).where(IdempotencyRecord.key == key))
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """
+    Build the store selected by `IDEMPOTENCY_BACKEND`.
+    """
+    if app_config.IDEMPOTENCY_BACKEND == "database":
+        return DatabaseIdempotencyStore(app_config.IDEMPOTENCY_TTL_SECONDS,
+                                        app_config.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS,
+                                        sweep_interval=app_config.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS)
+    return MemoryIdempotencyStore(app_config.IDEMPOTENCY_TTL_SECONDS, app_config.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS,
+                                  app_config.IDEMPOTENCY_MAX_ENTRIES)
@@ -0,0 +1,28 @@
+"""
+Write the OpenAPI document of the application to a file, loaded by the workers instead of generating it when
+OPENAPI_PREBUILT_PATH points to it.
+
+    python -m core.openapi openapi.json
+"""
+import argparse
+
+from core.config import app_config
+from core.openapi.document import render_openapi
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=app_config.OPENAPI_PREBUILT_PATH or "openapi.json",
+                        help="Output file, OPENAPI_PREBUILT_PATH by default.")
+    args = parser.parse_args()
+
+    from main import app
+
+    body = render_openapi(app.openapi())
+    with open(args.path, "wb") as file:
+        file.write(body)
+    print(f"OpenAPI document written to {args.path}, {len(body)} bytes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import brotli
+from fastapi import FastAPI
+
+from core.config import app_config
+
+logger = logging.getLogger(__name__)
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+# Documents are built per root path, which comes from the server configuration, this only bounds a misconfiguration.
+MAX_ROOT_PATHS = 16
+
+_build_lock = threading.Lock()
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+class EncodedAsset:
+    """
+    Response body encoded once in every supported content coding, with a strong ETag per coding.
+
+    Gzip output is deterministic (no timestamp), so every worker serves the same bytes under the same ETag and
+    clients revalidate across workers.
+    """
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.bodies = {IDENTITY: body, GZIP: gzip.compress(body, compresslevel=9, mtime=0),
+                       BROTLI: brotli.compress(body, quality=11)}
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etags = {coding: f'"{digest}"' if coding == IDENTITY else f'"{digest}-{coding}"'
+                      for coding in self.bodies}
+
+    def select(self, accept_encoding: Optional[str]) -> str:
+        """
+        Return the smallest coding accepted by the `Accept-Encoding` header, identity if there is none.
+        """
+        if not accept_encoding:
+            return IDENTITY
+        accepted = _parse_accept_encoding(accept_encoding)
+        for coding in (BROTLI, GZIP):
+            if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+                return coding
+        return IDENTITY
+
+    def not_modified(self, coding: str, if_none_match: Optional[str]) -> bool:
+        """
+        Whether the `If-None-Match` header matches the ETag of `coding`, compared weakly as required for it.
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etags[coding] in tags
+
+    def headers(self, coding: str) -> Dict[str, str]:
+        headers = {"ETag": self.etags[coding], "Vary": "Accept-Encoding",
+                   "Cache-Control": app_config.OPENAPI_CACHE_CONTROL}
+        if coding != IDENTITY:
+            headers["Content-Encoding"] = coding
+        return headers
+
+
+def render_openapi(schema: Dict[str, Any]) -> bytes:
+    """
+    Serialise an OpenAPI schema the way FastAPI's `/openapi.json` route does.
+    """
+    return json.dumps(schema, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _load_openapi(app: FastAPI) -> Tuple[Dict[str, Any], str]:
+    path = app_config.OPENAPI_PREBUILT_PATH
+    if path and os.path.exists(path):
+        with open(path, "rb") as file:
+            return json.load(file), path
+    if path:
+        logger.warning("Prebuilt OpenAPI document %s not found, generating it.", path)
+    return app.openapi(), "the routes"
+
+
+def _with_root_path(app: FastAPI, schema: Dict[str, Any], root_path: str) -> Dict[str, Any]:
+    # Like FastAPI's own route, clients behind a path prefix proxy call the API under the prefix.
+    servers = schema.get("servers", [])
+    if not root_path or not app.root_path_in_servers or root_path in {server.get("url") for server in servers}:
+        return schema
+    return dict(schema, servers=[{"url": root_path}, *servers])
+
+
+def get_openapi_document(app: FastAPI, root_path: str = "") -> EncodedAsset:
+    """
+    Return the encoded OpenAPI document of `app` served under `root_path`, built on the first call (the `openapi`
+    warmup step builds the document of the application's root path).
+
+    The schema is read from `OPENAPI_PREBUILT_PATH` when the file exists, written by `python -m core.openapi` at
+    build time, and generated from the routes otherwise. A prebuilt file has to be rebuilt whenever the routes or
+    schemas change. Under a root path the schema lists it as its first server, as FastAPI's `/openapi.json` does.
+
+    :param root_path: The ASGI root path of the requests, without trailing slash.
+    """
+    documents: Dict[str, EncodedAsset] = getattr(app.state, "openapi_documents", {})
+    if (document := documents.get(root_path)) is None:
+        with _build_lock:
+            documents = getattr(app.state, "openapi_documents", {})
+            if (document := documents.get(root_path)) is None:
+                if (schema := getattr(app.state, "openapi_schema", None)) is None:
+                    schema, source = _load_openapi(app)
+                    app.state.openapi_schema = schema
+                    logger.info("OpenAPI schema loaded from %s.", source)
+                document = EncodedAsset(render_openapi(_with_root_path(app, schema, root_path)), "application/json")
+                # Replaced rather than updated, readers on the event loop never see the dictionary change.
+                documents = {**documents, root_path: document}
+                while len(documents) > MAX_ROOT_PATHS:
+                    documents.pop(next(iter(documents)))
+                app.state.openapi_documents = documents
+                logger.info("OpenAPI document of root path '%s' encoded, %s.", root_path,
+                            ", ".join(f"{coding} {len(body)} bytes" for coding, body in document.bodies.items()))
+    return document
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+from fastapi import APIRouter, FastAPI
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.openapi.document import MAX_ROOT_PATHS, EncodedAsset, get_openapi_document
+
+OPENAPI_URL = "/openapi.json"
+DOCS_URL = "/docs"
+OAUTH2_REDIRECT_URL = "/docs/oauth2-redirect"
+REDOC_URL = "/redoc"
+
+openapi_router = APIRouter(
+    include_in_schema=False,
+)
+
+
+def _asset_response(request: Request, asset: EncodedAsset) -> Response:
+    coding = asset.select(request.headers.get("accept-encoding"))
+    headers = asset.headers(coding)
+    if asset.not_modified(coding, request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(asset.bodies[coding], media_type=asset.media_type, headers=headers)
+
+
+def _root_path(request: Request) -> str:
+    return request.scope.get("root_path", "").rstrip("/")
+
+
+@lru_cache(maxsize=MAX_ROOT_PATHS)
+def _docs_page(app: FastAPI, page: str, root_path: str) -> EncodedAsset:
+    if page == DOCS_URL:
+        html = get_swagger_ui_html(openapi_url=root_path + OPENAPI_URL, title=app.title + " - Swagger UI",
+                                   oauth2_redirect_url=root_path + OAUTH2_REDIRECT_URL,
+                                   init_oauth=app.swagger_ui_init_oauth,
+                                   swagger_ui_parameters=app.swagger_ui_parameters)
+    elif page == REDOC_URL:
+        html = get_redoc_html(openapi_url=root_path + OPENAPI_URL, title=app.title + " - ReDoc")
+    else:
+        html = get_swagger_ui_oauth2_redirect_html()
+    return EncodedAsset(html.body, html.media_type)
+
+
+@openapi_router.api_route(OPENAPI_URL, methods=["GET", "HEAD"])
+async def api_openapi(request: Request):
+    """
+    The OpenAPI document, pre-encoded at startup and answered with 304 while the client's ETag is current.
+    """
+    root_path = _root_path(request)
+    document = getattr(request.app.state, "openapi_documents", {}).get(root_path)
+    if document is None:
+        document = await run_in_threadpool(get_openapi_document, request.app, root_path)
+    return _asset_response(request, document)
+
+
+@openapi_router.get(DOCS_URL)
+async def api_swagger_ui(request: Request):
+    """Swagger UI, rendered once per root path."""
+    return _asset_response(request, _docs_page(request.app, DOCS_URL, _root_path(request)))
+
+
+@openapi_router.get(OAUTH2_REDIRECT_URL)
+async def api_swagger_ui_redirect(request: Request):
+    """The OAuth2 redirect page of Swagger UI."""
+    return _asset_response(request, _docs_page(request.app, OAUTH2_REDIRECT_URL, ""))
+
+
+@openapi_router.get(REDOC_URL)
+async def api_redoc(request: Request):
+    """ReDoc, rendered once per root path."""
+    return _asset_response(request, _docs_page(request.app, REDOC_URL, _root_path(request)))
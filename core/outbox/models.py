@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, JSON, String, Text
+
+from core.database.core import Base
+from core.database.manager import QueryManager, uuid7
+from core.database.types import UUIDType
+from core.models import TimeStampMixin
+
+
+class OutboxMessage(Base, TimeStampMixin, QueryManager):
+    """
+    Model for storing messages waiting to be delivered.
+
+    Messages are written in the same transaction as the change that triggers them and delivered later by the
+    `OutboxDispatcher`, so request latency never includes delivery latency.
+
+    Fields:
+        kind (str): The kind of message, decides how it is rendered.
+        recipient (str): The address the message is delivered to.
+        user_id (str): The user the message belongs to, if any.
+        payload (dict): Kind-specific data used to render the message.
+        status (str): One of `pending`, `sending` (claimed by a dispatcher) or `failed`, delivered messages are deleted.
+        attempts (int): The number of delivery attempts so far.
+        next_attempt_at (datetime): The earliest time of the next delivery attempt, the claim expiry while sending.
+        last_error (str): The error of the last failed delivery attempt.
+    """
+    __tablename__ = "outbox_message"
+    __id_generator__ = staticmethod(uuid7)
+    __shard_key__ = "user_id"
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_FAILED = "failed"
+
+    id = Column(UUIDType(), primary_key=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(255), nullable=False)
+    user_id = Column(UUIDType())
+    payload = Column(JSON, default=dict)
+    status = Column(String(20), nullable=False, default=STATUS_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+
+    __table_args__ = (
+        Index("ix_outbox_message_status_next_attempt_at", "status", "next_attempt_at"),
+    )
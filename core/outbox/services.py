@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, select, update
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.auth.utils import generate_otp, urlsafe_base64_encode
+from core.config import app_config
+from core.constants import OTP_MESSAGE_SUBJECT, OTP_MESSAGE_BODY
+from core.database.core import SessionLocal, engines
+from core.database.sharding import shard_router
+from core.outbox.models import OutboxMessage
+from core.outbox.transports import OutgoingMessage, Transport, get_transport
+
+logger = logging.getLogger(__name__)
+
+OTP_VERIFICATION = "otp_verification"
+
+
+def enqueue_otp_message(user, session: Session) -> OutboxMessage:
+    """
+    Queue the OTP verification message of a newly registered user.
+
+    The message is added to `session`, so it is committed together with the user. The OTP itself is generated at
+    delivery time, which keeps it valid however long the message waited in the outbox.
+
+    :param user: The registered user.
+    :param session: The session the user was added to.
+    :return: The queued outbox message.
+    """
+    data = {"kind": OTP_VERIFICATION, "recipient": user.email, "user_id": user.id, "payload": {}}
+    return OutboxMessage.create_with_uuid(data=data, session=session)
+
+
+def render_message(message: OutboxMessage) -> OutgoingMessage:
+    """
+    Render an outbox message into the subject and body handed to the transport.
+    """
+    if message.kind == OTP_VERIFICATION:
+        uid = urlsafe_base64_encode(str(message.user_id).encode('utf-8'))
+        body = OTP_MESSAGE_BODY.format(uid=uid, otp=generate_otp(message.user_id))
+        return OutgoingMessage(id=message.id, recipient=message.recipient, subject=OTP_MESSAGE_SUBJECT, body=body)
+    raise ValueError(f"Unknown outbox message kind '{message.kind}'.")
+
+
+class OutboxDispatcher:
+    """
+    Drains the outbox in batches through a `Transport`.
+
+    Failed messages are retried with exponential backoff until `max_attempts` is reached. While full batches keep
+    coming the dispatcher loops without sleeping, so bursts are drained at the batch rate of the transport.
+
+    Every worker runs a dispatcher. A batch is claimed with a conditional update committed before it is sent, which
+    marks the messages `sending` for `claim_timeout` seconds, so concurrent dispatchers never send the same message,
+    also on SQLite where `FOR UPDATE SKIP LOCKED` is not available. Messages of a dispatcher that died while sending
+    are claimed again once the claim expired.
+
+    Delivered messages are deleted with the commit that records the delivery. Failed messages are kept for
+    `failed_retention` seconds for inspection, the dispatcher deletes older ones every `prune_interval` seconds.
+    """
+
+    def __init__(self, transport: Transport, batch_size: int, poll_interval: float, max_attempts: int,
+                 backoff: float, claim_timeout: float, failed_retention: float, prune_interval: float):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.claim_timeout = claim_timeout
+        self.failed_retention = failed_retention
+        self.prune_interval = prune_interval
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        delay = self.backoff * 2 ** (attempts - 1)
+        return timedelta(seconds=delay + random.uniform(0, delay / 2))
+
+    def _record_failure(self, message: OutboxMessage, error: str, now: datetime) -> None:
+        message.last_error = error
+        if message.attempts >= self.max_attempts:
+            message.status = OutboxMessage.STATUS_FAILED
+            logger.error("Outbox message %s failed after %s attempts: %s", message.id, message.attempts, error)
+        else:
+            message.status = OutboxMessage.STATUS_PENDING
+            message.next_attempt_at = now + self._retry_delay(message.attempts)
+
+    def _claim(self, session: Session, shard_id: int, limit: int, now: datetime) -> List[OutboxMessage]:
+        """
+        Claim up to `limit` due messages of a shard, pending ones and those whose claim expired, and commit the claim.
+        """
+        due = and_(OutboxMessage.status.in_([OutboxMessage.STATUS_PENDING, OutboxMessage.STATUS_SENDING]),
+                   OutboxMessage.next_attempt_at <= now)
+        candidates = select(OutboxMessage.id).where(due).order_by(OutboxMessage.next_attempt_at).limit(limit) \
+            .with_for_update(skip_locked=True)
+        claim = update(OutboxMessage).values(status=OutboxMessage.STATUS_SENDING,
+                                             attempts=OutboxMessage.attempts + 1,
+                                             next_attempt_at=now + timedelta(seconds=self.claim_timeout))
+        claim = claim.execution_options(synchronize_session=False)
+        bind_arguments = {"shard_id": shard_id}
+        if session.get_bind(OutboxMessage.__mapper__, shard_id=shard_id).dialect.update_returning:
+            claimed_ids = session.execute(claim.where(OutboxMessage.id.in_(candidates.scalar_subquery()), due)
+                                          .returning(OutboxMessage.id), bind_arguments=bind_arguments).scalars().all()
+        else:
+            # One conditional update per message, the rowcount tells whether this dispatcher claimed it.
+            claimed_ids = [message_id for message_id in session.execute(candidates, bind_arguments=bind_arguments)
+                           .scalars().all()
+                           if session.execute(claim.where(OutboxMessage.id == message_id, due),
+                                              bind_arguments=bind_arguments).rowcount]
+        session.commit()
+        if not claimed_ids:
+            return []
+        query = session.query(OutboxMessage).filter(OutboxMessage.id.in_(claimed_ids))
+        if shard_router is not None:
+            query = query.options(set_shard_id(shard_id))
+        return query.all()
+
+    def dispatch_batch(self) -> int:
+        """
+        Deliver one batch of due messages.
+
+        :return: The number of messages taken from the outbox.
+        """
+        with SessionLocal() as session:
+            now = datetime.utcnow()
+            messages = []
+            for shard_id in engines:
+                if len(messages) < self.batch_size:
+                    messages += self._claim(session, shard_id, self.batch_size - len(messages), now)
+            if not messages:
+                return 0
+
+            outgoing, errors = [], {}
+            for message in messages:
+                try:
+                    outgoing.append(render_message(message))
+                except Exception as e:
+                    errors[message.id] = str(e)
+            try:
+                errors.update(self.transport.send_batch(outgoing) if outgoing else {})
+            except Exception as e:
+                errors.update({message.id: str(e) for message in outgoing})
+
+            for message in messages:
+                if message.id in errors:
+                    self._record_failure(message, errors[message.id], now)
+                else:
+                    session.delete(message)
+            session.commit()
+            return len(messages)
+
+    def prune(self) -> int:
+        """
+        Delete the failed messages older than `failed_retention` seconds.
+
+        :return: The number of deleted messages.
+        """
+        with SessionLocal() as session:
+            deleted = session.execute(delete(OutboxMessage).where(
+                OutboxMessage.status == OutboxMessage.STATUS_FAILED,
+                OutboxMessage.modified_at <= datetime.utcnow() - timedelta(seconds=self.failed_retention),
+            )).rowcount
+            session.commit()
+        return deleted
+
+    async def run(self) -> None:
+        """
+        Dispatch batches and prune failed messages every `prune_interval` seconds until cancelled.
+        """
+        pruned_at = None
+        while True:
+            try:
+                if pruned_at is None or asyncio.get_running_loop().time() - pruned_at >= self.prune_interval:
+                    pruned_at = asyncio.get_running_loop().time()
+                    await run_in_threadpool(self.prune)
+                dispatched = await run_in_threadpool(self.dispatch_batch)
+            except Exception:
+                logger.exception("Outbox dispatch failed.")
+                dispatched = 0
+            if dispatched < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+
+def get_dispatcher(transport: Optional[Transport] = None) -> OutboxDispatcher:
+    """
+    Build an `OutboxDispatcher` from the application config.
+    """
+    return OutboxDispatcher(transport=transport or get_transport(),
+                            batch_size=app_config.OUTBOX_BATCH_SIZE,
+                            poll_interval=app_config.OUTBOX_POLL_INTERVAL_SECONDS,
+                            max_attempts=app_config.OUTBOX_MAX_ATTEMPTS,
+                            backoff=app_config.OUTBOX_RETRY_BACKOFF_SECONDS,
+                            claim_timeout=app_config.OUTBOX_CLAIM_TIMEOUT_SECONDS,
+                            failed_retention=app_config.OUTBOX_FAILED_RETENTION_SECONDS,
+                            prune_interval=app_config.OUTBOX_PRUNE_INTERVAL_SECONDS)
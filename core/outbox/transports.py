@@ -0,0 +1,93 @@
+import json
+import logging
+import smtplib
+import threading
+from dataclasses import dataclass, asdict
+from email.message import EmailMessage
+from typing import Dict, List
+
+from core.config import app_config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingMessage:
+    id: str
+    recipient: str
+    subject: str
+    body: str
+
+
+class Transport:
+    """
+    Base class of outbox delivery transports.
+
+    `send_batch` delivers a batch of messages and returns the errors of the messages that could not be delivered,
+    keyed by message id. Raising marks the whole batch as failed.
+    """
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> Dict[str, str]:
+        raise NotImplementedError
+
+
+class LoggingTransport(Transport):
+    """Logs messages instead of delivering them, for local development."""
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> Dict[str, str]:
+        for message in messages:
+            logger.info("Outbox message to %s: %s", message.recipient, message.body)
+        return {}
+
+
+class FileTransport(Transport):
+    """Appends messages as JSON lines to a local file, for tests and local development."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> Dict[str, str]:
+        lines = "".join(json.dumps(asdict(message)) + "\n" for message in messages)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+        return {}
+
+
+class SMTPTransport(Transport):
+    """
+    Delivers messages over SMTP, reusing one connection per batch.
+
+    Point it at a debugging server (e.g. `python -m aiosmtpd -n -l localhost:1025`) for local development.
+    """
+
+    def __init__(self, host: str, port: int, sender: str):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> Dict[str, str]:
+        errors = {}
+        with smtplib.SMTP(self.host, self.port) as smtp:
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = self.sender
+                email["To"] = message.recipient
+                email["Subject"] = message.subject
+                email.set_content(message.body)
+                try:
+                    smtp.send_message(email)
+                except smtplib.SMTPException as e:
+                    errors[message.id] = str(e)
+        return errors
+
+
+def get_transport() -> Transport:
+    """
+    Build the transport selected by `OUTBOX_TRANSPORT`.
+    """
+    if app_config.OUTBOX_TRANSPORT == "smtp":
+        return SMTPTransport(app_config.OUTBOX_SMTP_HOST, app_config.OUTBOX_SMTP_PORT, app_config.OUTBOX_SMTP_SENDER)
+    if app_config.OUTBOX_TRANSPORT == "file":
+        return FileTransport(app_config.OUTBOX_FILE_PATH)
+    return LoggingTransport()
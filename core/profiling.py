@@ -0,0 +1,221 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional
+
+from sqlalchemy import Engine, event
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.logger import request_id_var
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+
+@dataclass
+class RequestProfile:
+    """Counters collected for a profiled request."""
+    method: str
+    path: str
+    route: Optional[str] = None
+    request_id: Optional[str] = None
+    status_code: Optional[int] = None
+    duration: float = 0.0
+    query_count: int = 0
+    query_time: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+    samples: int = 0
+    # Nesting depth of the request's sections and queries per thread id, see `SamplingProfiler`. Keys are never
+    # removed, so the sampler can look threads up while other threads update their own entry.
+    active_threads: Counter = field(default_factory=Counter, repr=False)
+
+    def enter_thread(self) -> None:
+        self.active_threads[threading.get_ident()] += 1
+
+    def leave_thread(self) -> None:
+        self.active_threads[threading.get_ident()] -= 1
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def profiled_section(name: str):
+    """
+    Add the time spent in the block to the `name` timing of the request being profiled, if any.
+    """
+    if (profile := current_profile.get()) is None:
+        yield
+        return
+    started = time.perf_counter()
+    profile.enter_thread()
+    try:
+        yield
+    finally:
+        profile.leave_thread()
+        profile.timings[name] = profile.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query_start(conn, cursor, statement, parameters, context, executemany):
+    if (profile := current_profile.get()) is not None:
+        conn.info.setdefault("profile_query_start_time", []).append(time.perf_counter())
+        profile.enter_thread()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_query_end(conn, cursor, statement, parameters, context, executemany):
+    if (profile := current_profile.get()) is not None and (starts := conn.info.get("profile_query_start_time")):
+        profile.query_count += 1
+        profile.query_time += time.perf_counter() - starts.pop(-1)
+        profile.leave_thread()
+
+
+@event.listens_for(Engine, "handle_error")
+def _count_query_error(context):
+    if (profile := current_profile.get()) is not None and context.cursor is not None and \
+            context.connection is not None and (starts := context.connection.info.get("profile_query_start_time")):
+        starts.pop(-1)
+        profile.leave_thread()
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Samples the Python stacks of the threads working on a profiled request every `interval` seconds into collapsed
+    stacks.
+
+    Threadpool threads are only sampled while they run a `profiled_section` or a database query of the request, as
+    registered in `active_threads`, so the bcrypt, JWT and query stacks of concurrent requests are left out. The
+    event loop thread is always sampled; it also runs the coroutines of concurrent requests, so its stacks may
+    include theirs.
+    """
+
+    def __init__(self, interval: float, loop_thread_id: int, active_threads: Counter):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.loop_thread_id = loop_thread_id
+        self.active_threads = active_threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def _sample(self) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != self.loop_thread_id and self.active_threads.get(thread_id, 0) <= 0:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(frames))] += 1
+        self.samples += 1
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def sign_profile_request(secret_key: str, expires_at: int) -> str:
+    """
+    Build an `X-Profile` header value that triggers profiling until the unix timestamp `expires_at`.
+    """
+    signature = hmac.new(secret_key.encode("utf-8"), str(expires_at).encode("ascii"), hashlib.sha256).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def verify_profile_request(secret_key: str, value: str) -> bool:
+    expires_at, _, signature = value.partition(".")
+    if not secret_key or not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(sign_profile_request(secret_key, int(expires_at)), value)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles single requests on demand.
+
+    A request is profiled when it carries a valid signed `X-Profile` header, see `sign_profile_request`, or is picked
+    by `sample_rate`. Its collapsed stacks (`.folded`, readable by flamegraph tools, see `SamplingProfiler` for the
+    threads they cover) and its counters (`.json`: route, status, duration, database query count and time, bcrypt and
+    JWT time) are written to `output_dir`. One request per worker is profiled at a time.
+    """
+
+    def __init__(self, app: ASGIApp, output_dir: str, secret_key: str, sample_rate: float, interval: float):
+        self.app = app
+        self.output_dir = output_dir
+        self.secret_key = secret_key
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._active = False
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self._active:
+            return False
+        if (header := Headers(scope=scope).get(PROFILE_HEADER)) is not None:
+            return verify_profile_request(self.secret_key, header)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile = RequestProfile(method=scope["method"], path=scope["path"], request_id=request_id_var.get())
+        token = current_profile.set(profile)
+        profiler = SamplingProfiler(self.interval, threading.get_ident(), profile.active_threads)
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            profile.duration = time.perf_counter() - started
+            profiler.stop()
+            current_profile.reset(token)
+            self._active = False
+            if (endpoint := scope.get("endpoint")) is not None:
+                profile.route = endpoint.__name__
+            profile.samples = profiler.samples
+            await run_in_threadpool(self._write, profile, profiler.stacks)
+
+    def _write(self, profile: RequestProfile, stacks: Counter) -> None:
+        try:
+            self._write_files(profile, stacks)
+        except OSError:
+            logger.exception("Writing the profile of %s %s failed.", profile.method, profile.path)
+
+    def _write_files(self, profile: RequestProfile, stacks: Counter) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", profile.path).strip("_") or "root"
+        base_path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{profile.request_id}")
+        with open(f"{base_path}.folded", "w", encoding="utf-8") as file:
+            file.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        with open(f"{base_path}.json", "w", encoding="utf-8") as file:
+            counters = asdict(profile)
+            del counters["active_threads"]
+            json.dump(counters, file, indent=2)
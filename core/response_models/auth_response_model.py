@@ -37,3 +37,10 @@ class AuthenticationResponseModel:
 
     def otp_verification_response_model(self):
         return self.common_response_messages()
+
+    def token_refresh_response_model(self):
+        return {**self.common_response_messages(),
+                self.status_code_mapper.get('UNAUTHORIZED'): self.status_code_mapper.get('RESPONSE_MODEL')}
+
+    def logout_response_model(self):
+        return self.token_refresh_response_model()
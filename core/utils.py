@@ -15,5 +15,15 @@ def convert_data_into_json(request_data):
     return jsonable_encoder(request_data)
 
 
+def normalize_email(email: str) -> str:
+    """
+    normalize_email returns the canonical form of an email address used for storage and lookups.
+
+    :param email: Email address as received from the client.
+    :return: str: The stripped, lower-cased email address.
+    """
+    return email.strip().lower()
+
+
 def to_dict(obj: Base) -> Dict[str, Any]:
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict
+
+import pydantic
+from fastapi import FastAPI
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from core.auth.revocation import revocation_list
+from core.auth.schemas import UserRegistrationRequestSchema, UserLoginRequest
+from core.auth.utils import Hasher, JWTAuthenticator
+from core.config import app_config
+from core.database.core import engines, SessionLocal
+from core.openapi.document import get_openapi_document
+
+logger = logging.getLogger(__name__)
+
+_WARMUP_EMAIL = "warmup@example.com"
+_WARMUP_PASSWORD = "Warmup#2026"
+
+
+def warm_hasher(app: FastAPI) -> None:
+    """Load the bcrypt backend of passlib."""
+    Hasher.verify_password(_WARMUP_PASSWORD, Hasher.get_password_hash(_WARMUP_PASSWORD))
+
+
+def warm_jwt(app: FastAPI) -> None:
+    """Load the crypto backend of python-jose."""
+    authenticator = JWTAuthenticator()
+    token = authenticator.create_access_token(payload={"sub": _WARMUP_EMAIL})
+    authenticator.decode_token(token, app_config.ACCESS_TOKEN_SECRET_KEY)
+
+
+def warm_database(app: FastAPI) -> None:
+    """Open `WARMUP_DATABASE_CONNECTIONS` pool connections per shard and return them to the pool."""
+    connections = [engine.connect() for engine in engines.values()
+                   for _ in range(app_config.WARMUP_DATABASE_CONNECTIONS)]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_validators(app: FastAPI) -> None:
+    """Run the request schemas once, loading the email validator, and report a pure Python build of pydantic."""
+    if not pydantic.compiled:
+        logger.warning("Pydantic is not compiled, request validation runs in pure Python.")
+    UserRegistrationRequestSchema(first_name="warmup", last_name="warmup", password=_WARMUP_PASSWORD,
+                                  email=_WARMUP_EMAIL)
+    UserLoginRequest(email=_WARMUP_EMAIL, password=_WARMUP_PASSWORD)
+
+
+def warm_openapi(app: FastAPI) -> None:
+    """Build the encoded OpenAPI document, otherwise built on the first `/openapi.json` hit."""
+    get_openapi_document(app, app.root_path.rstrip("/"))
+
+
+def warm_revocation(app: FastAPI) -> None:
+    """Load the token revocation list, so revoked tokens are rejected from the first request on."""
+    with SessionLocal() as session:
+        revocation_list.sync(session)
+
+
+WARMUP_STEPS: Dict[str, Callable[[FastAPI], None]] = {
+    "hasher": warm_hasher,
+    "jwt": warm_jwt,
+    "database": warm_database,
+    "validators": warm_validators,
+    "openapi": warm_openapi,
+    "revocation": warm_revocation,
+}
+
+
+async def run_warmup(app: FastAPI) -> None:
+    """
+    Run the configured warmup steps in the threadpool and mark the application as ready.
+
+    A failing step is logged and skipped, it only leaves the corresponding path cold. When cancelled, the running
+    step's thread cannot be interrupted, the cancellation waits for it instead of letting the worker exit under it.
+    """
+    if app_config.WARMUP_ENABLED:
+        for name in app_config.WARMUP_STEPS:
+            if (step := WARMUP_STEPS.get(name)) is None:
+                logger.warning("Unknown warmup step '%s' skipped.", name)
+                continue
+            started = time.perf_counter()
+            step_run = asyncio.ensure_future(run_in_threadpool(step, app))
+            try:
+                await asyncio.shield(step_run)
+            except asyncio.CancelledError:
+                await asyncio.gather(step_run, return_exceptions=True)
+                raise
+            except Exception:
+                logger.exception("Warmup step '%s' failed.", name)
+            else:
+                logger.info("Warmup step '%s' took %.3fs.", name, time.perf_counter() - started)
+    app.state.ready = True
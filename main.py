@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from sqlalchemy.orm import scoped_session
@@ -5,14 +8,48 @@ from starlette import status
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
 
+from core.admission import AdmissionControlMiddleware, get_admission_control_options
+from core.auth.revocation import revocation_list
 from core.auth.views import auth_router
 from core.config import app_config
-from core.database.core import SessionLocal, Base, engine
-from core.exceptions import ExistsError, BadRequestException
+from core.database.core import SessionLocal, Base, engines
+from core.exceptions import ExistsError, BadRequestException, UnauthorizedException
+from core.health.views import health_router
+from core.idempotency.middleware import IdempotencyMiddleware, get_fingerprint_key
+from core.idempotency.stores import get_idempotency_store
+from core.logger import configured_logging, RequestIdMiddleware
+from core.openapi.views import openapi_router
+from core.outbox.services import get_dispatcher
+from core.profiling import ProfilingMiddleware
+from core.warmup import run_warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Configure logging for the lifetime of the application, warm the worker up in the background, the readiness
+    endpoint reports ready once it is done, run the outbox dispatcher and keep the token revocation list up to date.
+    """
+    with configured_logging(app_config):
+        app.state.ready = False
+        background_tasks = [
+            asyncio.create_task(run_warmup(app)),
+            asyncio.create_task(revocation_list.run(app_config.REVOCATION_SYNC_INTERVAL_SECONDS,
+                                                    app_config.REVOCATION_PRUNE_INTERVAL_SECONDS)),
+        ]
+        if app_config.OUTBOX_DISPATCHER_ENABLED:
+            background_tasks.append(asyncio.create_task(get_dispatcher().run()))
+        yield
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+
 
-app = FastAPI()
+# The documentation routes are served pre-encoded by `openapi_router`.
+app = FastAPI(lifespan=lifespan, openapi_url=None, docs_url=None, redoc_url=None)
 
-Base.metadata.create_all(engine)
+for engine in engines.values():
+    Base.metadata.create_all(engine)
 
 
 @app.middleware("http")
@@ -34,6 +71,23 @@ async def db_session_middleware(request: Request, call_next):
     return response
 
 
+if app_config.ADMISSION_CONTROL_ENABLED:
+    # Outside of the database session middleware, requests are shed before they take a database session.
+    app.add_middleware(AdmissionControlMiddleware, **get_admission_control_options())
+
+if app_config.IDEMPOTENCY_ENABLED:
+    # Outside of admission control, so replays are served and waiting duplicates queue without taking a slot.
+    app.add_middleware(IdempotencyMiddleware, store=get_idempotency_store(), paths=app_config.IDEMPOTENCY_PATHS,
+                       fingerprint_key=get_fingerprint_key())
+
+if app_config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, output_dir=app_config.PROFILING_OUTPUT_DIR,
+                       secret_key=app_config.PROFILING_SECRET_KEY, sample_rate=app_config.PROFILING_SAMPLE_RATE,
+                       interval=app_config.PROFILING_INTERVAL_SECONDS)
+
+app.add_middleware(RequestIdMiddleware)
+
+
 @app.exception_handler(ExistsError)
 async def already_exists_handler(request, exc):
     return JSONResponse(
@@ -50,8 +104,19 @@ async def bad_request_handler(request, exc):
     )
 
 
+@app.exception_handler(UnauthorizedException)
+async def unauthorized_handler(request, exc):
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        content={'message': str(exc)},
+        headers={'WWW-Authenticate': 'Bearer'}
+    )
+
+
 """Initialized routers"""
 app.include_router(auth_router)
+app.include_router(health_router)
+app.include_router(openapi_router)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-import os
+import logging
 from logging.config import fileConfig
 
 from dotenv import load_dotenv
@@ -7,19 +7,36 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from core.database.batched_migration import PROGRESS_TABLE_NAME
 from core.database.core import Base
+from core.database.sharding import get_database_urls
 from core.auth import models
+from core.idempotency import models as idempotency_models
+from core.outbox import models as outbox_models
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 load_dotenv()
 config = context.config
-config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
+logger = logging.getLogger("alembic.env")
+
+
+def is_autogenerate() -> bool:
+    """Whether the command compares the models against the database, `revision --autogenerate` or `check`."""
+    cmd_opts = config.cmd_opts
+    return cmd_opts is not None and (getattr(cmd_opts, "autogenerate", False) or cmd_opts.cmd[0].__name__ == "check")
+
+
+# Migrations run against every shard in turn, or against DATABASE_URL when sharding is disabled. The shards share
+# one schema, so autogenerate only compares against the first one.
+database_urls = get_database_urls()
+if is_autogenerate():
+    database_urls = dict([min(database_urls.items())])
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -27,6 +44,12 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = [Base.metadata]
 
+
+def include_name(name, type_, parent_names) -> bool:
+    """Leave the checkpoint table of batched migrations, created on demand, out of autogenerate."""
+    return not (type_ == "table" and name == PROGRESS_TABLE_NAME)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -45,16 +68,18 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
-    context.configure(
-        url=url,
-        target_metadata=target_metadata,
-        literal_binds=True,
-        dialect_opts={"paramstyle": "named"},
-    )
+    for shard_id, url in database_urls.items():
+        logger.info("Migrating shard %s", shard_id)
+        context.configure(
+            url=url,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            literal_binds=True,
+            dialect_opts={"paramstyle": "named"},
+        )
 
-    with context.begin_transaction():
-        context.run_migrations()
+        with context.begin_transaction():
+            context.run_migrations()
 
 
 def run_migrations_online() -> None:
@@ -64,19 +89,21 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
+    for shard_id, url in database_urls.items():
+        logger.info("Migrating shard %s", shard_id)
+        connectable = engine_from_config(
+            {**config.get_section(config.config_ini_section, {}), "sqlalchemy.url": url},
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        with connectable.connect() as connection:
+            context.configure(
+                connection=connection, target_metadata=target_metadata, include_name=include_name
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
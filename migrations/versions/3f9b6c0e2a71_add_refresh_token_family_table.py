@@ -0,0 +1,37 @@
+"""add refresh_token_family table.
+
+Revision ID: 3f9b6c0e2a71
+Revises: e7a2d91c4f58
+Create Date: 2026-10-18 13:41:52.106397
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from core.database.types import UUIDType
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9b6c0e2a71'
+down_revision = 'e7a2d91c4f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('refresh_token_family',
+    sa.Column('id', UUIDType(), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.Column('revoked', sa.Boolean(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('modified_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_refresh_token_family_expires_at'), 'refresh_token_family', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_refresh_token_family_expires_at'), table_name='refresh_token_family')
+    op.drop_table('refresh_token_family')
@@ -0,0 +1,60 @@
+"""store user primary key as a compact uuid instead of String(255).
+
+Revision ID: 5d0c3b7e9a12
+Revises: 8a973752383b
+Create Date: 2026-10-18 10:12:41.513024
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from core.database.batched_migration import run_batched_migration
+from core.database.types import UUIDType
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0c3b7e9a12'
+down_revision = '8a973752383b'
+branch_labels = None
+depends_on = None
+
+
+def _add_id_new_column(column_type) -> None:
+    # Already there when an interrupted run of the batched copy is resumed.
+    if "id_new" not in {column["name"] for column in sa.inspect(op.get_bind()).get_columns("user")}:
+        op.add_column("user", sa.Column("id_new", column_type, nullable=True))
+
+
+def _copy_ids(name: str, source_type, target_type) -> None:
+    """
+    Copy `user.id` into `user.id_new` in batches, converting the value between the two column types on the way.
+    """
+    user = sa.table("user", sa.column("id", source_type), sa.column("id_new", target_type))
+    copy = user.update().where(user.c.id == sa.bindparam("b_id")).values(id_new=sa.bindparam("b_id_new"))
+
+    def copy_chunk(connection, chunk) -> None:
+        ids = connection.execute(sa.select(user.c.id).where(chunk)).scalars().all()
+        connection.execute(copy, [{"b_id": user_id, "b_id_new": user_id} for user_id in ids])
+
+    run_batched_migration(f"{revision}_{name}", user.c.id, copy_chunk)
+
+
+def _swap_id_column(target_type) -> None:
+    # `reflect_args` keep the declared type when SQLite recreates the table, without casting the copied values.
+    with op.batch_alter_table("user", reflect_args=[sa.Column("id_new", target_type)]) as batch_op:
+        batch_op.drop_column("id")
+        batch_op.alter_column("id_new", new_column_name="id", nullable=False)
+    with op.batch_alter_table("user", reflect_args=[sa.Column("id", target_type)]) as batch_op:
+        batch_op.create_primary_key("pk_user", ["id"])
+
+
+def upgrade() -> None:
+    _add_id_new_column(UUIDType())
+    _copy_ids("upgrade_copy_ids", sa.String(length=255), UUIDType())
+    _swap_id_column(UUIDType())
+
+
+def downgrade() -> None:
+    _add_id_new_column(sa.String(length=255))
+    _copy_ids("downgrade_copy_ids", UUIDType(), sa.String(length=255))
+    _swap_id_column(sa.String(length=255))
@@ -0,0 +1,33 @@
+"""add revoked_token table.
+
+Revision ID: 9c4d2e8b1a36
+Revises: 3f9b6c0e2a71
+Create Date: 2026-10-18 14:55:20.631870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d2e8b1a36'
+down_revision = '3f9b6c0e2a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('revoked_token',
+    sa.Column('jti', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index(op.f('ix_revoked_token_created_at'), 'revoked_token', ['created_at'], unique=False)
+    op.create_index(op.f('ix_revoked_token_expires_at'), 'revoked_token', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_revoked_token_expires_at'), table_name='revoked_token')
+    op.drop_index(op.f('ix_revoked_token_created_at'), table_name='revoked_token')
+    op.drop_table('revoked_token')
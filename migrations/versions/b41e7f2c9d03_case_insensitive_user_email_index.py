@@ -0,0 +1,43 @@
+"""normalise user emails and index lower(email).
+
+Revision ID: b41e7f2c9d03
+Revises: 5d0c3b7e9a12
+Create Date: 2026-10-18 11:03:17.208841
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from core.database.batched_migration import run_batched_migration
+from core.database.types import UUIDType
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e7f2c9d03'
+down_revision = '5d0c3b7e9a12'
+branch_labels = None
+depends_on = None
+
+user = sa.table("user", sa.column("id", UUIDType()), sa.column("email", sa.String(length=255)))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    normalised_email = sa.func.lower(sa.func.trim(user.c.email))
+
+    duplicates = bind.execute(
+        sa.select(normalised_email).where(user.c.email.isnot(None))
+        .group_by(normalised_email).having(sa.func.count() > 1)
+    ).scalars().all()
+    if duplicates:
+        raise RuntimeError(f"Cannot normalise user emails, {len(duplicates)} addresses differ only by case or "
+                           f"whitespace, e.g. '{duplicates[0]}'. Merge these accounts first.")
+
+    run_batched_migration(f"{revision}_normalise_emails", user.c.id, lambda connection, chunk: connection.execute(
+        user.update().where(chunk, user.c.email != normalised_email).values(email=normalised_email)))
+    op.create_index("ix_user_email_lower", "user", [sa.text("lower(email)")], unique=True,
+                    postgresql_where=sa.text("email IS NOT NULL"), sqlite_where=sa.text("email IS NOT NULL"))
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_email_lower", table_name="user")
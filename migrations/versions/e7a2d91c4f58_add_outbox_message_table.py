@@ -0,0 +1,42 @@
+"""add outbox_message table.
+
+Revision ID: e7a2d91c4f58
+Revises: b41e7f2c9d03
+Create Date: 2026-10-18 12:26:05.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from core.database.types import UUIDType
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2d91c4f58'
+down_revision = 'b41e7f2c9d03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_message',
+    sa.Column('id', UUIDType(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('recipient', sa.String(length=255), nullable=False),
+    sa.Column('user_id', UUIDType(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('modified_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_message_status_next_attempt_at', 'outbox_message', ['status', 'next_attempt_at'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_message_status_next_attempt_at', table_name='outbox_message')
+    op.drop_table('outbox_message')